@@ -0,0 +1,217 @@
+"""
+Model backends for the live streamer.
+
+A backend owns everything model-specific: how the network is built, the
+checkpoint format, input normalization and padding. The streamer only hands
+it lists of RGB uint8 frames of one shape and gets RGB uint8 frames back.
+
+    unet     DeblurUNet (backend/ml/model.py), [0, 1] input, plain state_dict
+    nafnet   NAFNetSmall/Medium (nafnet_model.py), [-1, 1] input,
+             {"model_state_dict": ...} checkpoints, reflect-padded to 32
+    onnx     Exported runtime model via onnxruntime (see export_trt.py)
+"""
+import os
+import time
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+
+class ModelBackend:
+    """Base class. Subclasses implement load/prepare/forward/finish."""
+
+    name = "base"
+
+    def __init__(self, checkpoint=None, device="cpu"):
+        self.checkpoint = checkpoint
+        self.device = device
+
+    def load(self):
+        raise NotImplementedError
+
+    def prepare(self, frames):
+        """List of HxWx3 uint8 arrays -> model input."""
+        raise NotImplementedError
+
+    def forward(self, inputs):
+        raise NotImplementedError
+
+    def finish(self, outputs, shape):
+        """Model output -> list of HxWx3 uint8 arrays cropped to `shape` (h, w)."""
+        raise NotImplementedError
+
+    def run(self, frames):
+        """prepare + forward + finish. Returns (enhanced frames, forward time)."""
+        inputs = self.prepare(frames)
+        start = time.time()
+        outputs = self.forward(inputs)
+        inf_time = time.time() - start
+        return self.finish(outputs, frames[0].shape[:2]), inf_time
+
+    def warmup(self, shape=(720, 1280), batch_size=1, iterations=2):
+        """Runs dummy forwards at the stream's frame shape so the first real frame is not slow."""
+        dummy = [np.zeros((shape[0], shape[1], 3), dtype=np.uint8)] * batch_size
+        for _ in range(iterations):
+            self.run(dummy)
+
+
+class TorchBackend(ModelBackend):
+    """PyTorch models: normalization to `value_range` and padding to `pad_multiple`."""
+
+    value_range = (0.0, 1.0)
+    pad_multiple = 1
+
+    def build_model(self):
+        raise NotImplementedError
+
+    def load_weights(self, model):
+        raise NotImplementedError
+
+    def load(self):
+        model = self.build_model()
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            self.load_weights(model)
+            print(f"Model loaded successfully ({self.name}).")
+        else:
+            print(f"Warning: No model found for {self.name}. Using random weights.")
+        self.model = model.to(self.device)
+        self.model.eval()
+        return self
+
+    def prepare(self, frames):
+        batch = torch.from_numpy(np.stack(frames)).permute(0, 3, 1, 2).float() / 255.0
+        low, high = self.value_range
+        if (low, high) != (0.0, 1.0):
+            batch = batch * (high - low) + low
+        batch = batch.to(self.device)
+
+        h, w = batch.shape[2], batch.shape[3]
+        pad_h = (self.pad_multiple - h % self.pad_multiple) % self.pad_multiple
+        pad_w = (self.pad_multiple - w % self.pad_multiple) % self.pad_multiple
+        if pad_h or pad_w:
+            batch = F.pad(batch, (0, pad_w, 0, pad_h), mode='reflect')
+        return batch
+
+    def forward(self, inputs):
+        with torch.no_grad():
+            return self.model(inputs)
+
+    def finish(self, outputs, shape):
+        h, w = shape
+        outputs = outputs[:, :, :h, :w]
+        low, high = self.value_range
+        outputs = ((outputs - low) / (high - low)).clamp(0, 1)
+        outputs = outputs.permute(0, 2, 3, 1).cpu().numpy()
+        return list((outputs * 255).astype(np.uint8))
+
+
+class UNetBackend(TorchBackend):
+    name = "unet"
+
+    def build_model(self):
+        from ml.model import DeblurUNet
+        return DeblurUNet()
+
+    def load_weights(self, model):
+        # weights_only: a checkpoint must never be able to run code when unpickled
+        state = torch.load(self.checkpoint, map_location=self.device, weights_only=True)
+        model.load_state_dict(state)
+
+
+class NAFNetBackend(TorchBackend):
+    name = "nafnet"
+    value_range = (-1.0, 1.0)
+    pad_multiple = 32
+
+    def __init__(self, checkpoint=None, device="cpu", model_size="small"):
+        super().__init__(checkpoint, device)
+        self.model_size = model_size
+
+    def build_model(self):
+        # nafnet_model.py lives at the repo root (added to sys.path by main.py)
+        from nafnet_model import NAFNetSmall, NAFNetMedium
+        return NAFNetSmall() if self.model_size == "small" else NAFNetMedium()
+
+    def load_weights(self, model):
+        checkpoint = torch.load(self.checkpoint, map_location=self.device, weights_only=True)
+        model.load_state_dict(checkpoint["model_state_dict"])
+        if "psnr" in checkpoint:
+            print(f"Checkpoint PSNR: {checkpoint['psnr']:.2f} dB")
+
+
+class ONNXBackend(ModelBackend):
+    """
+    onnxruntime session. Models exported with a fixed spatial size (as
+    export_trt.py does) get frames resized in and out; dynamic ones are padded.
+    """
+
+    name = "onnx"
+
+    def __init__(self, checkpoint=None, device="cpu", value_range=(0.0, 1.0), pad_multiple=16):
+        super().__init__(checkpoint, device)
+        self.value_range = value_range
+        self.pad_multiple = pad_multiple
+
+    def load(self):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("onnxruntime is not installed. "
+                              "Please install it to use the onnx backend.")
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            raise FileNotFoundError(f"ONNX model not found: {self.checkpoint}")
+
+        providers = ["CPUExecutionProvider"]
+        if str(self.device).startswith("cuda"):
+            providers.insert(0, "CUDAExecutionProvider")
+        self.session = ort.InferenceSession(self.checkpoint, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        h, w = model_input.shape[2], model_input.shape[3]
+        self.fixed_size = (h, w) if isinstance(h, int) and isinstance(w, int) else None
+        print(f"ONNX model loaded ({self.checkpoint}, input {model_input.shape}).")
+        return self
+
+    def prepare(self, frames):
+        import cv2
+        if self.fixed_size is not None:
+            h, w = self.fixed_size
+            frames = [cv2.resize(f, (w, h), interpolation=cv2.INTER_AREA) for f in frames]
+        batch = np.stack(frames).astype(np.float32).transpose(0, 3, 1, 2) / 255.0
+        low, high = self.value_range
+        batch = batch * (high - low) + low
+
+        if self.fixed_size is None:
+            h, w = batch.shape[2], batch.shape[3]
+            pad_h = (self.pad_multiple - h % self.pad_multiple) % self.pad_multiple
+            pad_w = (self.pad_multiple - w % self.pad_multiple) % self.pad_multiple
+            if pad_h or pad_w:
+                batch = np.pad(batch, ((0, 0), (0, 0), (0, pad_h), (0, pad_w)), mode='reflect')
+        return np.ascontiguousarray(batch)
+
+    def forward(self, inputs):
+        return self.session.run(None, {self.input_name: inputs})[0]
+
+    def finish(self, outputs, shape):
+        import cv2
+        h, w = shape
+        low, high = self.value_range
+        outputs = np.clip((outputs - low) / (high - low), 0, 1)
+        outputs = (outputs.transpose(0, 2, 3, 1) * 255).astype(np.uint8)
+        if self.fixed_size is not None:
+            return [cv2.resize(o, (w, h), interpolation=cv2.INTER_LINEAR) for o in outputs]
+        return [o[:h, :w] for o in outputs]
+
+
+BACKENDS = {
+    "unet": UNetBackend,
+    "nafnet": NAFNetBackend,
+    "onnx": ONNXBackend,
+}
+
+
+def create_backend(name="unet", checkpoint=None, device="cpu", **options):
+    """Builds and loads a backend by name ("unet", "nafnet" or "onnx")."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{name}'. Choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name](checkpoint, device, **options).load()
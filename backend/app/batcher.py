@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class DynamicBatcher:
+    """
+    Groups single-item requests that arrive close together into one batch
+    for a single worker thread (server-side dynamic batching).
+
+    A batch runs as soon as `max_batch_size` items are waiting or
+    `max_delay` seconds after its first item arrived, whichever comes
+    first. fn(items) must return one result per item; if it raises, every
+    request in the batch gets the exception. submit() raises RuntimeError
+    when `max_pending` items are already waiting.
+    """
+
+    def __init__(self, name, fn, max_batch_size=8, max_delay=0.005, max_pending=64):
+        self.name = name
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.pending = deque()  # (item, future, arrival time)
+        self._cond = threading.Condition()
+        self.stats = {"batches": 0, "items": 0, "avg_batch_size": 0, "batch_ms": 0,
+                      "queue_wait_ms": 0, "queue_depth": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queues `item`. Returns a concurrent.futures.Future for its result."""
+        future = Future()
+        with self._cond:
+            if len(self.pending) >= self.max_pending:
+                raise RuntimeError(f"Too many pending {self.name} requests, try again later")
+            self.pending.append((item, future, time.time()))
+            self.stats["queue_depth"] = len(self.pending)
+            self._cond.notify()
+        return future
+
+    def _collect(self):
+        with self._cond:
+            while not self.pending:
+                self._cond.wait()
+            deadline = self.pending[0][2] + self.max_delay
+            while len(self.pending) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self.pending), self.max_batch_size)
+            batch = [self.pending.popleft() for _ in range(count)]
+            self.stats["queue_depth"] = len(self.pending)
+        # Requests whose caller gave up (disconnect, timeout) are dropped here;
+        # the rest can no longer be cancelled, so setting their result is safe
+        return [request for request in batch if request[1].set_running_or_notify_cancel()]
+
+    def _loop(self):
+        while True:
+            try:
+                batch = self._collect()
+                if batch:
+                    self._run(batch)
+            except Exception as e:
+                # Never let one bad batch stop the thread every later request waits on
+                print(f"Error in {self.name} batcher: {e}")
+                self.stats["errors"] += 1
+
+    def _run(self, batch):
+        start = time.time()
+        try:
+            results = self.fn([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} returned {len(results)} results "
+                                   f"for {len(batch)} items")
+        except Exception as e:
+            print(f"Error in {self.name} batch of {len(batch)}: {e}")
+            self.stats["errors"] += 1
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        elapsed_ms = (time.time() - start) * 1000
+        wait_ms = sum(start - arrived for _, _, arrived in batch) / len(batch) * 1000
+        self.stats["batches"] += 1
+        self.stats["items"] += len(batch)
+        self.stats["avg_batch_size"] = (self.stats["avg_batch_size"] * 0.9) + (len(batch) * 0.1)
+        self.stats["batch_ms"] = (self.stats["batch_ms"] * 0.9) + (elapsed_ms * 0.1)
+        self.stats["queue_wait_ms"] = (self.stats["queue_wait_ms"] * 0.9) + (wait_ms * 0.1)
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
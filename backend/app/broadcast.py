@@ -0,0 +1,97 @@
+import asyncio
+import json
+from collections import deque
+from app.protocol import PROTOCOL_JSON, PROTOCOL_BINARY, pack_frame
+
+
+class FrameMessage:
+    """A published frame plus its wire encodings, built at most once each."""
+
+    ENCODERS = {
+        PROTOCOL_JSON: lambda msg: json.dumps(msg.json_view),
+        PROTOCOL_BINARY: lambda msg: pack_frame(msg.frame),
+    }
+
+    def __init__(self, seq, frame, json_view):
+        self.seq = seq
+        self.frame = frame
+        self.json_view = json_view
+        self._encoded = {}
+
+    def encoded(self, protocol):
+        data = self._encoded.get(protocol)
+        if data is None:
+            data = self.ENCODERS[protocol](self)
+            self._encoded[protocol] = data
+        return data
+
+
+class Subscriber:
+    """
+    Per-client bounded queue. When the client falls behind, the oldest
+    pending frame is dropped so a slow socket never blocks the others.
+    """
+
+    def __init__(self, protocol, maxsize):
+        self.protocol = protocol
+        self.pending = deque(maxlen=maxsize)
+        self.last_seq = 0
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, message):
+        if message.seq <= self.last_seq:
+            return  # Already queued or sent
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(message)
+        self.last_seq = message.seq
+        self._ready.set()
+
+    async def get(self):
+        """Waits for the next frame and returns it encoded for this client."""
+        while not self.pending:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.pending.popleft().encoded(self.protocol)
+
+
+class FrameHub:
+    """
+    Fans published frames out to WebSocket subscribers. Each frame gets a
+    sequence number, is encoded once per protocol in use, and is only pushed
+    to subscribers that have not received it yet.
+    """
+
+    def __init__(self, client_queue_size=2):
+        self.client_queue_size = client_queue_size
+        self.subscribers = set()
+        self.latest = None
+        self.seq = 0
+        self.dropped = 0
+
+    def publish(self, frame, json_view):
+        """Publishes a frame to every subscriber. Must run on the event loop."""
+        self.seq += 1
+        self.latest = FrameMessage(self.seq, frame, json_view)
+        for sub in self.subscribers:
+            sub.push(self.latest)
+        return self.latest
+
+    def subscribe(self, protocol=PROTOCOL_JSON):
+        sub = Subscriber(protocol, self.client_queue_size)
+        if self.latest is not None:
+            sub.push(self.latest)  # New clients start from the current frame
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+        self.dropped += sub.dropped
+
+    def stats(self):
+        return {
+            "ws_clients": len(self.subscribers),
+            "ws_dropped_frames": self.dropped + sum(sub.dropped for sub in self.subscribers),
+            "last_seq": self.seq,
+        }
@@ -0,0 +1,182 @@
+"""
+Image encoders for streamed frames.
+
+All encoders take an RGB uint8 array and return compressed bytes. The fastest
+available backend is picked automatically: libjpeg-turbo (PyTurboJPEG) for
+JPEG, then OpenCV, then PIL.
+
+Benchmark on a sample frame:
+    python -m app.encoders path/to/frame.jpg
+"""
+import time
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+except ImportError:
+    TurboJPEG = None
+
+FORMATS = ("JPEG", "WEBP")
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+class FrameEncoder:
+    """Base encoder: format, quality and optional downscale factor (0 < scale <= 1)."""
+
+    name = "base"
+
+    def __init__(self, fmt="JPEG", quality=75, scale=1.0):
+        fmt = fmt.upper()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported stream format: {fmt}")
+        self.format = fmt
+        self.mime_type = MIME_TYPES[fmt]
+        self.quality = quality
+        self.scale = scale
+
+    def clone(self):
+        """Fresh encoder with the same settings (encoders are not thread-safe)."""
+        return type(self)(self.format, self.quality, self.scale)
+
+    def target_size(self, img_arr):
+        h, w = img_arr.shape[:2]
+        return max(1, int(w * self.scale)), max(1, int(h * self.scale))
+
+    def encode(self, img_arr):
+        raise NotImplementedError
+
+
+class PILEncoder(FrameEncoder):
+    """Pure PIL fallback. Reuses one output buffer per encoder."""
+
+    name = "pil"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._buffer = BytesIO()
+
+    def encode(self, img_arr):
+        img_pil = Image.fromarray(img_arr)
+        if self.scale < 1.0:
+            img_pil = img_pil.resize(self.target_size(img_arr), Image.BILINEAR)
+
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        img_pil.save(self._buffer, format=self.format, quality=self.quality)
+        return self._buffer.getvalue()
+
+
+class OpenCVEncoder(FrameEncoder):
+    """cv2.imencode backend, typically 2-3x faster than PIL."""
+
+    name = "opencv"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.format == "JPEG":
+            self._ext = ".jpg"
+            self._params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        else:
+            self._ext = ".webp"
+            self._params = [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        self._bgr = None
+
+    def encode(self, img_arr):
+        if self.scale < 1.0:
+            img_arr = cv2.resize(img_arr, self.target_size(img_arr), interpolation=cv2.INTER_AREA)
+
+        # Reuse the colour-conversion buffer between frames of the same shape
+        if self._bgr is None or self._bgr.shape != img_arr.shape:
+            self._bgr = np.empty_like(img_arr)
+        cv2.cvtColor(img_arr, cv2.COLOR_RGB2BGR, dst=self._bgr)
+
+        ok, buf = cv2.imencode(self._ext, self._bgr, self._params)
+        if not ok:
+            raise ValueError(f"cv2.imencode failed for {self.format}")
+        return buf.tobytes()
+
+
+class TurboJPEGEncoder(FrameEncoder):
+    """libjpeg-turbo bindings (PyTurboJPEG). JPEG only, encodes RGB directly."""
+
+    name = "turbojpeg"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.format != "JPEG":
+            raise ValueError("TurboJPEG only supports JPEG")
+        self._jpeg = TurboJPEG()
+
+    def encode(self, img_arr):
+        if self.scale < 1.0 and cv2 is not None:
+            img_arr = cv2.resize(img_arr, self.target_size(img_arr), interpolation=cv2.INTER_AREA)
+        elif self.scale < 1.0:
+            size = self.target_size(img_arr)
+            img_arr = np.array(Image.fromarray(img_arr).resize(size, Image.BILINEAR))
+        return self._jpeg.encode(np.ascontiguousarray(img_arr), quality=self.quality,
+                                 pixel_format=TJPF_RGB)
+
+
+def available_backends(fmt="JPEG"):
+    """Encoder classes usable for `fmt` in this environment, fastest first."""
+    backends = []
+    if TurboJPEG is not None and fmt.upper() == "JPEG":
+        try:
+            TurboJPEG()
+            backends.append(TurboJPEGEncoder)
+        except Exception:
+            pass  # Python bindings installed without the shared library
+    if cv2 is not None:
+        backends.append(OpenCVEncoder)
+    backends.append(PILEncoder)
+    return backends
+
+
+def get_encoder(fmt="JPEG", quality=75, scale=1.0, backend="auto"):
+    """Returns an encoder instance. backend: "auto", "turbojpeg", "opencv" or "pil"."""
+    backends = available_backends(fmt)
+    if backend != "auto":
+        backends = [cls for cls in backends if cls.name == backend]
+        if not backends:
+            raise ValueError(f"Encoder backend '{backend}' is not available for {fmt}")
+    return backends[0](fmt, quality, scale)
+
+
+def benchmark_encoders(img_arr, fmt="JPEG", quality=75, scale=1.0, iterations=20):
+    """Times every available backend on `img_arr`. Returns {name: {"ms": .., "bytes": ..}}."""
+    results = {}
+    for cls in available_backends(fmt):
+        encoder = cls(fmt, quality, scale)
+        data = encoder.encode(img_arr)  # Warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            data = encoder.encode(img_arr)
+        elapsed = (time.perf_counter() - start) / iterations
+        results[cls.name] = {"ms": round(elapsed * 1000, 2), "bytes": len(data)}
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark stream frame encoders")
+    parser.add_argument("image", help="Sample frame to encode")
+    parser.add_argument("--format", default="JPEG", choices=FORMATS)
+    parser.add_argument("--quality", type=int, default=75)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    frame = np.array(Image.open(args.image).convert("RGB"))
+    print(f"Frame: {frame.shape[1]}x{frame.shape[0]}, "
+          f"{args.format} q={args.quality} scale={args.scale}")
+    results = benchmark_encoders(frame, args.format, args.quality, args.scale, args.iterations)
+    for name, result in results.items():
+        print(f"  {name:<10} {result['ms']:>8.2f} ms/frame  {result['bytes']:>9,} bytes")
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import queue
+import struct
+import bisect
+import threading
+
+# Record in a .log segment: header, JSON metadata, thumbnail bytes
+RECORD_HEADER = struct.Struct("<dQII")  # timestamp, frame_id, meta_len, thumb_len
+# Entry in the matching .idx file: one per record
+INDEX_ENTRY = struct.Struct("<dQ")  # timestamp, byte offset in the .log
+
+
+class EventLog:
+    """
+    Append-only, segment-based log of per-frame results for one stream.
+
+    Each published frame is stored as a record (timestamp, frame id, JSON
+    metadata such as inference time, blur score and detections, plus the
+    encoded preview as a thumbnail). Records go to numbered segments
+    `00000001.log` with a fixed-size `00000001.idx` of (timestamp, offset)
+    pairs, so a replay can seek to any point in time without scanning.
+
+    append() never blocks the pipeline: records are handed to a background
+    writer through a bounded queue and dropped (and counted) if it is full.
+    Segments roll over at `segment_bytes`; only the newest `max_segments`
+    are kept. Segments survive restarts, a new one is started on open.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, max_segments=32,
+                 queue_size=1024, store_thumbnails=True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(1, max_segments)
+        self.store_thumbnails = store_thumbnails
+        os.makedirs(directory, exist_ok=True)
+
+        existing = self.segments()
+        self.segment_seq = existing[-1] + 1 if existing else 1
+        self._log = None
+        self._idx = None
+        self._lock = threading.Lock()  # Guards segment rollover/deletion against readers
+        self.stats = {"event_log_records": 0, "event_log_dropped": 0,
+                      "event_log_segments": len(existing)}
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._writer_loop, name="event-log", daemon=True)
+        self._thread.start()
+
+    def _path(self, seq, ext):
+        return os.path.join(self.directory, f"{seq:08d}{ext}")
+
+    def segments(self):
+        """Sequence numbers of the segments on disk, oldest first."""
+        seqs = []
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext == ".log" and stem.isdigit():
+                seqs.append(int(stem))
+        return sorted(seqs)
+
+    def append(self, frame, timestamp=None):
+        """Queues a published frame dict for writing. Returns False if it was dropped."""
+        meta = {
+            "filename": frame.get("filename"),
+            "inference_ms": round(frame.get("inference_ms", 0), 3),
+            "blur_score": frame.get("blur_score"),
+            "deblurred": frame.get("deblurred", True),
+            "mime_type": frame.get("mime_type", "image/jpeg"),
+            "detections": frame.get("detections", []),
+        }
+        thumbnail = frame.get("enhanced_jpeg", b"") if self.store_thumbnails else b""
+        try:
+            self.queue.put_nowait((timestamp or time.time(), frame["frame_id"], meta, thumbnail))
+            return True
+        except queue.Full:
+            self.stats["event_log_dropped"] += 1
+            return False
+
+    def _open_segment(self):
+        self._log = open(self._path(self.segment_seq, ".log"), "ab")
+        self._idx = open(self._path(self.segment_seq, ".idx"), "ab")
+        self.stats["event_log_segments"] = len(self.segments())
+
+    def _roll_segment(self):
+        self._close_segment()
+        with self._lock:
+            self.segment_seq += 1
+            seqs = self.segments()
+            for seq in seqs[:max(0, len(seqs) + 1 - self.max_segments)]:
+                for ext in (".log", ".idx"):
+                    try:
+                        os.remove(self._path(seq, ext))
+                    except OSError:
+                        pass
+        self._open_segment()
+
+    def _close_segment(self):
+        if self._log is not None:
+            self._log.close()
+            self._idx.close()
+            self._log = self._idx = None
+
+    def _write(self, record):
+        try:
+            self._write_record(record)
+        except OSError as e:
+            print(f"Error writing event log record: {e}")
+            self.stats["event_log_dropped"] += 1
+
+    def _write_record(self, record):
+        timestamp, frame_id, meta, thumbnail = record
+        if self._log is None:
+            self._open_segment()
+        elif self._log.tell() >= self.segment_bytes:
+            self._roll_segment()
+
+        meta = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+        offset = self._log.tell()
+        self._log.write(RECORD_HEADER.pack(timestamp, frame_id, len(meta), len(thumbnail)))
+        self._log.write(meta)
+        self._log.write(thumbnail)
+        self._idx.write(INDEX_ENTRY.pack(timestamp, offset))
+        self.stats["event_log_records"] += 1
+
+    def _writer_loop(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            self._write(record)
+            # Write whatever else is queued, then flush once. The .log is
+            # flushed before the .idx so indexed records are always complete.
+            while True:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self._flush()
+                    self._close_segment()
+                    return
+                self._write(record)
+            self._flush()
+        self._close_segment()
+
+    def _flush(self):
+        if self._log is not None:
+            self._log.flush()
+            self._idx.flush()
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _read_index(self, seq):
+        try:
+            with open(self._path(seq, ".idx"), "rb") as f:
+                data = f.read()
+        except OSError:
+            return []
+        count = len(data) // INDEX_ENTRY.size
+        return [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size) for i in range(count)]
+
+    def read(self, since=None, until=None, thumbnails=True):
+        """
+        Yields records (dict with timestamp, frame_id, metadata and, if
+        requested, "thumbnail" bytes) with since <= timestamp <= until, in
+        write order. Only records already flushed by the writer are seen.
+        """
+        with self._lock:
+            seqs = self.segments()
+        for seq in seqs:
+            index = self._read_index(seq)
+            if not index or (until is not None and index[0][0] > until):
+                continue
+            if since is not None and index[-1][0] < since:
+                continue
+
+            start = 0
+            if since is not None:
+                start = bisect.bisect_left([ts for ts, _ in index], since)
+            try:
+                log = open(self._path(seq, ".log"), "rb")
+            except OSError:
+                continue  # Deleted by retention since listing
+            with log:
+                for timestamp, offset in index[start:]:
+                    if until is not None and timestamp > until:
+                        return
+                    log.seek(offset)
+                    header = log.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    timestamp, frame_id, meta_len, thumb_len = RECORD_HEADER.unpack(header)
+                    record = json.loads(log.read(meta_len))
+                    record["timestamp"] = timestamp
+                    record["frame_id"] = frame_id
+                    if thumbnails:
+                        record["thumbnail"] = log.read(thumb_len)
+                    yield record
+
+    def get_stats(self):
+        return {**self.stats, "event_log_queue": self.queue.qsize()}
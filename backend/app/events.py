@@ -0,0 +1,151 @@
+"""
+Low-bandwidth event channel served on /ws/events.
+
+Events are small JSON objects, one per processed frame plus a periodic
+timing summary per stream:
+
+    {"type": "frame", "stream_id", "frame_id", "timestamp", "filename",
+     "inference_ms", "blur_score", "deblurred", "detections": [...],
+     "wagon_numbers": [...]}
+    {"type": "timings", "stream_id", "timestamp", "fps", "latency_ms": {...}}
+
+Detections are {"label", "confidence", "bbox"}; wagon numbers are
+{"text", "confidence", "bbox"}, read by the stream's OCR stage on sampled
+frames (see pipeline.FrameDetector). Clients subscribe with filters and only receive
+what matches them, never the images.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+
+EVENT_FRAME = "frame"
+EVENT_TIMINGS = "timings"
+
+
+def frame_event(stream_id, frame):
+    """Builds the compact frame event for a published frame dict."""
+    return {
+        "type": EVENT_FRAME,
+        "stream_id": stream_id,
+        "frame_id": frame["frame_id"],
+        "timestamp": time.time(),
+        "filename": frame.get("filename"),
+        "inference_ms": round(frame.get("inference_ms", 0), 2),
+        "blur_score": frame.get("blur_score"),
+        "deblurred": frame.get("deblurred", True),
+        "detections": frame.get("detections", []),
+        "wagon_numbers": frame.get("wagon_numbers", []),
+    }
+
+
+def timings_event(stream_id, stats, latency_ms):
+    return {
+        "type": EVENT_TIMINGS,
+        "stream_id": stream_id,
+        "timestamp": time.time(),
+        "fps": round(stats.get("fps", 0), 2),
+        "latency_ms": latency_ms,
+    }
+
+
+def _split(value):
+    """"a,b" -> {"a", "b"}; None/"" -> None (no filter)."""
+    if not value:
+        return None
+    return {item.strip() for item in value.split(",") if item.strip()} or None
+
+
+class EventFilter:
+    """
+    Subscription filter. stream_ids, labels and types are comma-separated
+    strings (None = everything). With a label or min_confidence filter, frame
+    events keep only matching detections/wagon numbers and are skipped when
+    none remain. OCR'd wagon numbers match the label "wagon_number".
+    """
+
+    def __init__(self, stream_ids=None, labels=None, min_confidence=0.0, types=None):
+        self.stream_ids = _split(stream_ids)
+        self.labels = _split(labels)
+        self.min_confidence = min_confidence or 0.0
+        self.types = _split(types)
+
+    def apply(self, event):
+        """Returns the event as this subscriber should see it, or None."""
+        if self.types is not None and event["type"] not in self.types:
+            return None
+        if self.stream_ids is not None and event["stream_id"] not in self.stream_ids:
+            return None
+        if event["type"] != EVENT_FRAME or (self.labels is None and not self.min_confidence):
+            return event
+
+        detections = [d for d in event["detections"]
+                      if d.get("confidence", 0) >= self.min_confidence
+                      and (self.labels is None or d.get("label") in self.labels)]
+        wagon_numbers = [w for w in event["wagon_numbers"]
+                         if w.get("confidence", 0) >= self.min_confidence]
+        if self.labels is not None and "wagon_number" not in self.labels:
+            wagon_numbers = []
+        if not detections and not wagon_numbers:
+            return None
+        return {**event, "detections": detections, "wagon_numbers": wagon_numbers}
+
+
+class EventSubscriber:
+    """Bounded drop-oldest queue of serialized events for one client."""
+
+    def __init__(self, event_filter, maxsize):
+        self.filter = event_filter
+        self.pending = deque(maxlen=maxsize)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, event):
+        event = self.filter.apply(event)
+        if event is None:
+            return
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(json.dumps(event))
+        self._ready.set()
+
+    async def get(self):
+        while not self.pending:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.pending.popleft()
+
+
+class EventBus:
+    """
+    Fans pipeline events out to /ws/events subscribers across all streams.
+    Events are far smaller than frames, so clients get a deeper queue.
+    """
+
+    def __init__(self, client_queue_size=256):
+        self.client_queue_size = client_queue_size
+        self.subscribers = set()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, event):
+        """Publishes an event dict to every matching subscriber. Must run on the event loop."""
+        self.published += 1
+        for sub in self.subscribers:
+            sub.push(event)
+
+    def subscribe(self, event_filter=None):
+        sub = EventSubscriber(event_filter or EventFilter(), self.client_queue_size)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+        self.dropped += sub.dropped
+
+    def stats(self):
+        return {
+            "event_clients": len(self.subscribers),
+            "events_published": self.published,
+            "events_dropped": self.dropped + sum(sub.dropped for sub in self.subscribers),
+        }
@@ -0,0 +1,216 @@
+"""
+Single-pass video ingest.
+
+FrameFanout decodes a video once and hands every frame to several
+consumers, each running on its own thread behind a bounded queue:
+
+    AnnotatedVideoWriter   YOLO-annotated copy of the video (HLS + fragmented MP4)
+    FrameSink              every frame as a JPEG (input for mod_train)
+    StreamFeed             pushes frames into a streamer's PushSource
+
+A blocking consumer slows the decoder down when its queue is full
+(backpressure); a non-blocking one (the stream feed) drops frames instead.
+A consumer that fails is detached and reports its error; the others go on.
+"""
+import os
+import queue
+import threading
+import time
+import cv2
+from app.media import ProgressiveVideoWriter
+from app.sources import open_capture
+
+_END = object()
+
+
+class FrameConsumer:
+    """Base consumer. open() receives the video info dict (fps, width, height, frames)."""
+
+    name = "consumer"
+    blocking = True  # False: drop frames instead of stalling the decoder
+
+    def open(self, info):
+        pass
+
+    def consume(self, index, frame):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def result(self):
+        return None
+
+
+class AnnotatedVideoWriter(FrameConsumer):
+    """
+    Runs YOLO on each frame and writes the plotted result progressively
+    (see media.ProgressiveVideoWriter). on_ready() is called once, as soon
+    as the first segment can be played.
+    """
+
+    name = "yolo"
+
+    def __init__(self, output_dir, model_path, segment_seconds=2, on_ready=None):
+        self.output_dir = output_dir
+        self.model_path = model_path
+        self.segment_seconds = segment_seconds
+        self.on_ready = on_ready
+        self.model = None
+        self.writer = None
+
+    def open(self, info):
+        try:
+            from ultralytics import YOLO
+        except ImportError:
+            raise ImportError("ultralytics module is not installed. Please install it.")
+        self.model = YOLO(self.model_path)
+        self.writer = ProgressiveVideoWriter(self.output_dir, info["fps"], self.segment_seconds)
+
+    def consume(self, index, frame):
+        self.writer.write(self.model(frame, verbose=False)[0].plot())
+        if self.on_ready is not None and self.writer.ready():
+            self.on_ready(self.writer)
+            self.on_ready = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+
+    def result(self):
+        return self.writer
+
+
+class FrameSink(FrameConsumer):
+    """Writes frames as frame_000000.jpg, ... like extract_frames_from_video."""
+
+    name = "frames"
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.count = 0
+
+    def open(self, info):
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def consume(self, index, frame):
+        cv2.imwrite(os.path.join(self.output_dir, f"frame_{index:06d}.jpg"), frame)
+        self.count += 1
+
+    def result(self):
+        return self.count
+
+
+class StreamFeed(FrameConsumer):
+    """Feeds decoded frames to a live stream without ever holding up ingest."""
+
+    name = "stream"
+    blocking = False
+
+    def __init__(self, source):
+        self.source = source
+
+    def consume(self, index, frame):
+        self.source.push(frame)
+
+    def close(self):
+        self.source.finish()
+
+
+class FrameFanout:
+    """
+    Decodes `video_path` once and distributes the frames.
+
+    progress: optional callable(frames_decoded, frames_total); it may raise
+    (e.g. JobCancelled) to stop the decode, in which case consumers are
+    closed and the exception propagates. For a file still being written,
+    check_cancelled and idle_timeout bound the wait for more bytes (see
+    TailingCapture).
+    """
+
+    def __init__(self, video_path, consumers, queue_size=8, is_complete=None, progress=None,
+                 check_cancelled=None, idle_timeout=None):
+        self.video_path = video_path
+        self.consumers = consumers
+        self.queue_size = queue_size
+        self.is_complete = is_complete
+        self.progress = progress
+        self.check_cancelled = check_cancelled
+        self.idle_timeout = idle_timeout
+        self.errors = {}
+        self.dropped = {consumer.name: 0 for consumer in consumers}
+
+    def _consumer_loop(self, consumer, frames):
+        while True:
+            item = frames.get()
+            if item is _END:
+                break
+            if consumer.name in self.errors:
+                continue  # Detached; keep draining so the decoder never blocks on us
+            try:
+                consumer.consume(*item)
+            except Exception as e:
+                print(f"Ingest consumer {consumer.name} failed: {e}")
+                self.errors[consumer.name] = str(e)
+
+    def run(self):
+        """Decodes the whole video. Returns the number of frames decoded."""
+        cap = open_capture(self.video_path, self.is_complete, self.check_cancelled,
+                           self.idle_timeout)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file {self.video_path}")
+        info = {
+            "fps": cap.get(cv2.CAP_PROP_FPS),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        }
+
+        workers = []
+        for consumer in self.consumers:
+            try:
+                consumer.open(info)
+            except Exception as e:
+                print(f"Ingest consumer {consumer.name} disabled: {e}")
+                self.errors[consumer.name] = str(e)
+                continue
+            frames = queue.Queue(maxsize=self.queue_size)
+            thread = threading.Thread(target=self._consumer_loop, args=(consumer, frames),
+                                      name=f"ingest-{consumer.name}", daemon=True)
+            thread.start()
+            workers.append((consumer, frames, thread))
+
+        decoded = 0
+        start = time.time()
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                item = (decoded, frame)  # Consumers only read the frame, so it is shared
+                for consumer, frames, _ in workers:
+                    if consumer.blocking:
+                        frames.put(item)
+                    else:
+                        try:
+                            frames.put_nowait(item)
+                        except queue.Full:
+                            self.dropped[consumer.name] += 1
+                decoded += 1
+                if self.progress is not None:
+                    self.progress(decoded, info["frames"])
+        finally:
+            cap.release()
+            for consumer, frames, thread in workers:
+                frames.put(_END)
+            for consumer, frames, thread in workers:
+                thread.join()
+                try:
+                    consumer.close()
+                except Exception as e:
+                    self.errors.setdefault(consumer.name, str(e))
+
+        elapsed = max(time.time() - start, 0.001)
+        print(f"Ingested {decoded} frames from {self.video_path} in one pass "
+              f"({decoded / elapsed:.1f} FPS)")
+        return decoded
@@ -0,0 +1,105 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+EXTENSIONS = {"image/jpeg": ".jpg", "image/webp": ".webp"}
+
+
+class FrameCache:
+    """
+    Bounded LRU of full-resolution encoded frames, keyed by
+    (stream_id, frame_id) so a single cache and budget serves every stream.
+
+    Frames live in memory up to `memory_budget` bytes. Evicted frames are
+    spilled to `spill_dir`, which keeps at most `max_disk_frames` frames
+    before the oldest are deleted.
+    """
+
+    def __init__(self, memory_budget=256 * 1024 * 1024, spill_dir="frame_cache",
+                 max_disk_frames=2000):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.max_disk_frames = max_disk_frames
+        self.memory = OrderedDict()  # (stream_id, frame_id) -> (variants, mime_type, size)
+        self.memory_bytes = 0
+        self.on_disk = OrderedDict()  # (stream_id, frame_id) -> (variant names, mime_type)
+        self._lock = threading.Lock()
+
+        # Spilled frames from a previous run are meaningless (ids restart)
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _disk_path(self, key, variant, mime_type):
+        stream_id, frame_id = key
+        extension = EXTENSIONS.get(mime_type, ".bin")
+        return os.path.join(self.spill_dir, f"{stream_id}_{frame_id}_{variant}{extension}")
+
+    def put(self, stream_id, frame_id, variants, mime_type):
+        """variants: {"original": bytes, "enhanced": bytes}"""
+        size = sum(len(data) for data in variants.values())
+        with self._lock:
+            self.memory[(stream_id, frame_id)] = (variants, mime_type, size)
+            self.memory_bytes += size
+            while self.memory_bytes > self.memory_budget and len(self.memory) > 1:
+                old_key, (old_variants, old_mime, old_size) = self.memory.popitem(last=False)
+                self.memory_bytes -= old_size
+                self._spill(old_key, old_variants, old_mime)
+
+    def _spill(self, key, variants, mime_type):
+        if not self.spill_dir or not self.max_disk_frames:
+            return
+        for variant, data in variants.items():
+            with open(self._disk_path(key, variant, mime_type), "wb") as f:
+                f.write(data)
+        self.on_disk[key] = (tuple(variants), mime_type)
+
+        while len(self.on_disk) > self.max_disk_frames:
+            old_key, (old_variants, old_mime) = self.on_disk.popitem(last=False)
+            self._remove_files(old_key, old_variants, old_mime)
+
+    def _remove_files(self, key, variants, mime_type):
+        for variant in variants:
+            try:
+                os.remove(self._disk_path(key, variant, mime_type))
+            except OSError:
+                pass
+
+    def get(self, stream_id, frame_id, variant):
+        """Returns (bytes, mime_type) or None if the frame has been evicted."""
+        key = (stream_id, frame_id)
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                variants, mime_type, _ = entry
+                data = variants.get(variant)
+                return (data, mime_type) if data is not None else None
+
+            entry = self.on_disk.get(key)
+            if entry is None or variant not in entry[0]:
+                return None
+            path = self._disk_path(key, variant, entry[1])
+            mime_type = entry[1]
+
+        try:
+            with open(path, "rb") as f:
+                return f.read(), mime_type
+        except OSError:
+            return None  # Deleted by a concurrent spill
+
+    def drop_stream(self, stream_id):
+        """Forgets a removed stream's frames; its ids restart if it is added again."""
+        with self._lock:
+            for key in [key for key in self.memory if key[0] == stream_id]:
+                self.memory_bytes -= self.memory.pop(key)[2]
+            for key in [key for key in self.on_disk if key[0] == stream_id]:
+                self._remove_files(key, *self.on_disk.pop(key))
+
+    def stats(self):
+        return {
+            "frame_cache_memory_frames": len(self.memory),
+            "frame_cache_memory_mb": round(self.memory_bytes / (1024 * 1024), 1),
+            "frame_cache_disk_frames": len(self.on_disk),
+        }
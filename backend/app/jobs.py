@@ -0,0 +1,174 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.metrics import Counter
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when its job was cancelled."""
+
+
+class Job:
+    """
+    One background job. The job function receives the Job and reports
+    progress through update(); update() raises JobCancelled once the job
+    has been cancelled, so long loops stop at the next frame. A job may set
+    `result` early to publish partial output; the return value replaces it.
+    """
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stage = None
+        self.frames_done = 0
+        self.frames_total = 0
+        self.result = None
+        self.error = None
+        self.future = None
+        self.cleanup = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def update(self, frames_done=None, frames_total=None, stage=None):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if stage is not None:
+            self.stage = stage
+        if frames_total is not None:
+            self.frames_total = frames_total
+        if frames_done is not None:
+            self.frames_done = frames_done
+
+    def to_dict(self):
+        now = self.finished_at or time.time()
+        elapsed = now - self.started_at if self.started_at else 0
+        fps = self.frames_done / elapsed if elapsed > 0 else 0
+        progress = None
+        if self.frames_total:
+            progress = round(self.frames_done / self.frames_total, 3)
+        eta = None
+        if self.state == RUNNING and fps > 0 and self.frames_total:
+            eta = round(max(0, self.frames_total - self.frames_done) / fps, 1)
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "stage": self.stage,
+            "frames_done": self.frames_done,
+            "frames_total": self.frames_total,
+            "progress": progress,
+            "fps": round(fps, 2),
+            "eta_seconds": eta,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Bounded pool for long-running work such as processing uploaded videos.
+
+    At most `max_workers` jobs run at once; at most `max_pending` more wait
+    in the queue (submit() raises RuntimeError beyond that). The newest
+    `keep_finished` finished jobs stay queryable.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, keep_finished=100):
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self.jobs = OrderedDict()  # job_id -> Job, oldest first
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.failed_total = Counter()  # Finished jobs are pruned, so count failures separately
+
+    def submit(self, name, fn, *args, cleanup=None):
+        """
+        Queues fn(job, *args). cleanup(), if given, runs once the job has
+        finished however it ended, including cancelled before it started.
+        Returns the Job.
+        """
+        with self._lock:
+            pending = sum(1 for job in self.jobs.values() if job.state == QUEUED)
+            if pending >= self.max_pending:
+                raise RuntimeError("Too many queued jobs, try again later")
+            job = Job(name)
+            job.cleanup = cleanup
+            self.jobs[job.id] = job
+            self._prune()
+        job.future = self._pool.submit(self._run, job, fn, args)
+        return job
+
+    def full(self):
+        """True while submit() would be refused."""
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job.state == QUEUED) >= self.max_pending
+
+    def _run(self, job, fn, args):
+        if job.cancelled:
+            # Cancelled after the pool picked it up but before it started
+            self._finish(job, CANCELLED)
+            return
+        job.state = RUNNING
+        job.started_at = time.time()
+        state = FAILED
+        try:
+            job.result = fn(job, *args)
+            state = DONE
+        except JobCancelled:
+            state = CANCELLED
+        except Exception as e:
+            print(f"Job {job.id} ({job.name}) failed: {e}")
+            job.error = str(e)
+            self.failed_total.inc()
+        finally:
+            self._finish(job, state)
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished_at = time.time()
+        if job.cleanup is not None:
+            try:
+                job.cleanup()
+            except Exception as e:
+                print(f"Cleanup of job {job.id} ({job.name}) failed: {e}")
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job.state in (DONE, FAILED, CANCELLED)]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. Returns False if it is unknown or already finished."""
+        job = self.jobs.get(job_id)
+        if job is None or job.state in (DONE, FAILED, CANCELLED):
+            return False
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)  # Never started
+        return True
+
+    def stats(self):
+        states = [job.state for job in self.jobs.values()]
+        return {state: states.count(state) for state in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
@@ -1,12 +1,43 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, UploadFile, HTTPException
+from fastapi import (FastAPI, APIRouter, Depends, WebSocket, WebSocketDisconnect, File, UploadFile,
+                     HTTPException, Request, Response)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.streamer import VideoStreamer
-from app.utils import extract_frames_from_video, process_video_with_yolo
+from fastapi.responses import JSONResponse
+from app.manager import StreamManager
+from app.media import RangeStaticFiles, PLAYLIST_NAME, VIDEO_NAME
+from app.fanout import FrameFanout, AnnotatedVideoWriter, FrameSink, StreamFeed
+from app.sources import PushSource
+from app.protocol import PROTOCOL_JSON, PROTOCOL_BINARY, replay_payload
+from app.encoders import get_encoder
+from app.frame_cache import FrameCache
+from app.result_cache import ResultCache
+from app.event_log import EventLog
+from app.events import EventFilter
+from app.pipeline import FrameDetector
+from app.jobs import JobQueue, QUEUED, RUNNING
+from app.uploads import UploadManager
+from app.batcher import DynamicBatcher
+from app.processing import blank_image, decode_image, DeblurProcessor, DetectProcessor, OCRProcessor
+from app.readiness import Readiness
+from app.metrics import Counter, MetricsText, resident_memory_bytes
 from samples import mod_train
 import asyncio
+import cv2
+import hmac
+import importlib
+import itertools
 import os
+import re
+import sys
 import shutil
+import threading
+import time
+import uuid
+
+# Repo-root modules (blur_detector, deblur_agent, nafnet_model, ...)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(REPO_ROOT)
+from blur_detector import BlurDetector
+from temporal_reuse import TemporalTileCache
 
 app = FastAPI()
 
@@ -23,102 +54,723 @@ app.add_middleware(
 DATASET_PATH = r"c:\New folder\blurred_sharp"
 MODEL_PATH = r"c:\New folder\best.pth" 
 DEVICE = "cpu" # Default to CPU for safer demo on mixed hardware
+# "unet" (DeblurUNet), "nafnet" (NAFNet checkpoint) or "onnx" (exported model, see export_trt.py)
+MODEL_BACKEND = "unet"
+NAFNET_MODEL_SIZE = "small" # "small" or "medium" when MODEL_BACKEND = "nafnet"
+MODEL_DIR = "checkpoints" # /admin/model/reload only loads checkpoints from this directory
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") # X-Admin-Token for /admin/*; unset = localhost only
+STREAM_BATCH_SIZE = 1 # Frames per forward pass; 4-8 raises throughput on most hardware
+STREAM_BATCH_WAIT = 0.01 # Max seconds a partial batch waits for more frames
+STREAM_TARGET_FPS = 30 # Output pacing; late frames are dropped to stay real-time
+STREAM_FORMAT = "JPEG" # "JPEG" or "WEBP"
+STREAM_QUALITY = 75
+STREAM_PREVIEW_SCALE = 0.5 # WebSocket carries downscaled previews...
+FULL_RES_CACHE_MB = 256 # ...full-res frames are fetched from /frames/{id}/{variant}
+FULL_RES_SPILL_DIR = "frame_cache"
+# Optional video file, device index ("0") or URL (rtsp://...) to stream instead of DATASET_PATH
+STREAM_SOURCE = None
+UPLOAD_VIDEO_DIR = "uploaded_videos" # Uploaded videos are kept here while they are being streamed
+UPLOAD_FRAMES_DIR = "uploaded_frames" # Frames extracted for mod_train, one subdirectory per job
+UPLOAD_JOB_WORKERS = 1 # Uploads post-processed at the same time (YOLO is heavy)
+UPLOAD_JOB_QUEUE = 8 # Further uploads wait here; beyond this /upload_video returns 503
+UPLOAD_MAX_MB = 8192 # Largest chunked upload accepted by /uploads
+UPLOAD_SPOOL_MB = 16384 # Total size of unfinished chunked uploads on disk
+UPLOAD_START_MB = 4 # Start decoding a chunked upload once this much has arrived
+UPLOAD_IDLE_TIMEOUT = 300 # Seconds without a new chunk before decoding an upload gives up
+UPLOAD_FANOUT_QUEUE = 8 # Decoded frames buffered per ingest consumer (YOLO, frame sink, stream)
+PROCESSED_SEGMENT_SECONDS = 2 # HLS segment length; processed videos play after the first one
+DEFAULT_STREAM = "default" # Served by /ws, /stats and /upload_video
+CAMERA_STREAMS = {} # Extra cameras, e.g. {"left": "rtsp://cam-left/stream", "right": "1"}
+RESULT_CACHE_MB = 512 # Encoded results for replayed image files; 0 disables
+WARM_CACHE_ON_RELOAD = True # Pre-render a whole image directory in the background after a reload
+# Laplacian variance; frames scoring above it skip deblurring. Calibrate with blur_detector.py
+BLUR_GATE_THRESHOLD = None
+TILE_REUSE = False # Static cameras: only deblur tiles that changed since the previous frame
+TILE_SIZE = 128
+TILE_CHANGE_THRESHOLD = 3.0 # Mean absolute pixel difference (0-255) that marks a tile as changed
+# Append-only per-frame history per stream (replay with /ws/replay/{stream_id}); None disables
+EVENT_LOG_DIR = "event_log"
+EVENT_LOG_SEGMENT_MB = 64
+EVENT_LOG_MAX_SEGMENTS = 32 # Oldest segments are deleted beyond this
+DETECTION_ENABLED = False # YOLOv8 on deblurred frames, in a stage overlapped with deblurring
+DETECTION_MODEL_SIZE = "n"
+DETECTION_CONF = 0.25
+STREAM_OCR_INTERVAL = 25 # Detect stage OCRs wagon numbers at most every N frames; 0 disables
+DEBLUR_THREADS = None # Intra-op CPU threads for the deblur model (None = PyTorch default)
+DETECT_THREADS = None # Intra-op CPU threads for the detection stage
+PROCESS_MAX_BATCH = 8 # /process/* requests grouped into one forward
+PROCESS_MAX_DELAY_MS = 5 # How long the first request of a batch waits for more
+PROCESS_MAX_PENDING = 64 # Beyond this /process/* returns 503
+DEBLUR_OUTPUT_DIR = "backend/static/deblurred" # Results of /process/deblur, served under /static
+DEBLUR_OUTPUT_KEEP = 500 # Oldest results are deleted beyond this
+WARMUP_SHAPE = (720, 1280) # (h, w) of the dummy frame models are warmed up on at start-up
+# Also initialized in the background at start-up, besides the deblur model: "detect", "ocr",
+# "ultralytics"
+WARM_MODELS = ["ultralytics"]
 
 # Mount static files
 if not os.path.exists("backend/static"):
     os.makedirs("backend/static/processed_videos", exist_ok=True)
-app.mount("/static", StaticFiles(directory="backend/static"), name="static")
+# Range requests let players seek in processed videos while they are still being written
+app.mount("/static", RangeStaticFiles(directory="backend/static"), name="static")
+
+# One YOLO (and one OCR) instance serves the streams' detect stage and /process/*
+detect_model = DetectProcessor(DETECTION_MODEL_SIZE, DETECTION_CONF)
+ocr_model = OCRProcessor(use_gpu=DEVICE == "cuda")
+
+# One memory budget per cache for all streams, however many cameras are added
+frame_cache = FrameCache(FULL_RES_CACHE_MB * 1024 * 1024, FULL_RES_SPILL_DIR)
+result_cache = ResultCache(RESULT_CACHE_MB * 1024 * 1024) if RESULT_CACHE_MB else None
+
+def stream_options(stream_id):
+    # Encoders hold per-stream buffers, so every stream gets its own
+    return dict(
+        max_batch_size=STREAM_BATCH_SIZE, max_batch_wait=STREAM_BATCH_WAIT,
+        target_fps=STREAM_TARGET_FPS,
+        encoder=get_encoder(STREAM_FORMAT, STREAM_QUALITY, STREAM_PREVIEW_SCALE),
+        full_res_encoder=get_encoder(STREAM_FORMAT, STREAM_QUALITY),
+        frame_cache=frame_cache,
+        blur_gate=BlurDetector(BLUR_GATE_THRESHOLD) if BLUR_GATE_THRESHOLD is not None else None,
+        result_cache=result_cache,
+        warm_cache_on_reload=WARM_CACHE_ON_RELOAD,
+        tile_cache=(TemporalTileCache(TILE_SIZE, threshold=TILE_CHANGE_THRESHOLD)
+                    if TILE_REUSE else None),
+        event_log=(EventLog(os.path.join(EVENT_LOG_DIR, stream_id),
+                            EVENT_LOG_SEGMENT_MB * 1024 * 1024, EVENT_LOG_MAX_SEGMENTS)
+                   if EVENT_LOG_DIR else None),
+        detector=(FrameDetector(detect_model, ocr_model if STREAM_OCR_INTERVAL else None,
+                                STREAM_OCR_INTERVAL or 1) if DETECTION_ENABLED else None),
+        detect_threads=DETECT_THREADS,
+    )
+
+# All streams share a single model instance
+manager = StreamManager(MODEL_PATH, DEVICE, stream_options=stream_options,
+                        model_backend=MODEL_BACKEND,
+                        backend_options=({"model_size": NAFNET_MODEL_SIZE}
+                                         if MODEL_BACKEND == "nafnet" else None),
+                        intra_op_threads=DEBLUR_THREADS, lazy=True)
+streamer = manager.add_stream(DEFAULT_STREAM, dataset_path=DATASET_PATH)
+
+# Background jobs (video post-processing), polled with /jobs/{job_id}
+jobs = JobQueue(UPLOAD_JOB_WORKERS, UPLOAD_JOB_QUEUE)
+# Single-image API: concurrent requests are batched per model
+batch_options = dict(max_batch_size=PROCESS_MAX_BATCH, max_delay=PROCESS_MAX_DELAY_MS / 1000,
+                     max_pending=PROCESS_MAX_PENDING)
+batchers = {
+    "deblur": DynamicBatcher("deblur", DeblurProcessor(manager.runner), **batch_options),
+    "detect": DynamicBatcher("detect", detect_model, **batch_options),
+    "ocr": DynamicBatcher("ocr", ocr_model, **batch_options),
+}
+# Models are loaded after the server is up; /ready reports their progress
+readiness = Readiness(["deblur"] + WARM_MODELS)
+# Resumable chunked uploads, spooled next to the multipart ones
+uploads = UploadManager(UPLOAD_VIDEO_DIR, UPLOAD_MAX_MB * 1024 * 1024,
+                        UPLOAD_SPOOL_MB * 1024 * 1024, UPLOAD_START_MB * 1024 * 1024,
+                        sweep_interval=60)
 
-streamer = VideoStreamer(DATASET_PATH, MODEL_PATH, DEVICE)
+def get_streamer(stream_id):
+    s = manager.get(stream_id)
+    if s is None:
+        raise HTTPException(status_code=404, detail=f"Unknown stream {stream_id}")
+    return s
+
+def initialize(loop):
+    """
+    Start-up work that would otherwise delay serving: loads the deblur
+    model and warms it up, opens the configured sources, starts the streams,
+    then warms the optional models in WARM_MODELS.
+    """
+    readiness.run("deblur", lambda: manager.load_model(WARMUP_SHAPE, STREAM_BATCH_SIZE))
+    if STREAM_SOURCE is not None:
+        streamer.open_video(STREAM_SOURCE)
+    for stream_id, source in CAMERA_STREAMS.items():
+        try:
+            manager.add_stream(stream_id, source=source)
+        except ValueError as e:
+            print(f"Error adding camera stream {stream_id}: {e}")
+    if manager.ready:
+        loop.call_soon_threadsafe(manager.start)
+    else:
+        print("Streams not started: the deblur model could not be loaded")
+
+    for name in WARM_MODELS:
+        if name in batchers:
+            # Through the batcher, so the warm-up forward runs on the thread that serves requests
+            readiness.run(name, lambda name=name: batchers[name].submit(
+                blank_image(WARMUP_SHAPE)).result())
+        elif name == "ultralytics":
+            # Upload jobs import it on their first video otherwise
+            readiness.run(name, lambda: importlib.import_module("ultralytics"))
 
 @app.on_event("startup")
 async def startup_event():
-    # Start streamer in background
-    asyncio.create_task(streamer.start_stream())
+    # Start streamers in background once the model is loaded
+    loop = asyncio.get_running_loop()
+    threading.Thread(target=initialize, args=(loop,), name="startup", daemon=True).start()
 
 @app.get("/")
 def read_root():
     return {"status": "Railway Inspection AI Online"}
 
+@app.get("/ready")
+def get_ready():
+    """Readiness probe: 200 once the models are loaded and warm, 503 before."""
+    status = readiness.to_dict()
+    for name, batcher in batchers.items():
+        # Models not warmed at start-up load on their first request
+        status["models"].setdefault(name, {"state": "ready" if batcher.fn.loaded else "cold"})
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 @app.get("/stats")
 def get_stats():
-    return streamer.stats
+    return streamer.get_stats()
+
+@app.get("/stats/{stream_id}")
+def get_stream_stats(stream_id: str):
+    return get_streamer(stream_id).get_stats()
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus text exposition: per-stage latency histograms, frame/drop/
+    upload/error counters and queue, client and memory gauges. Reads the
+    same per-stream stats as /stats, without percentile computation.
+    """
+    streams = list(manager.streams.items())
+    out = MetricsText()
+
+    out.declare("railway_stage_latency_seconds", "histogram",
+                "Per-frame latency of each pipeline stage.")
+    for stream_id, s in streams:
+        for stage, histogram in s.latency.histograms.items():
+            out.histogram("railway_stage_latency_seconds", histogram,
+                          {"stream": stream_id, "stage": stage})
+
+    out.declare("railway_frames_processed_total", "counter", "Frames run through the deblur stage.")
+    for stream_id, s in streams:
+        out.sample("railway_frames_processed_total", s.stats["processed_count"],
+                   {"stream": stream_id})
+
+    # The source counter restarts when a stream switches source
+    out.declare("railway_frames_dropped_total", "counter",
+                "Frames dropped, by where they were dropped.")
+    for stream_id, s in streams:
+        hub = s.hub.stats()
+        out.sample("railway_frames_dropped_total", s.stats["dropped_frames"],
+                   {"stream": stream_id, "reason": "pacing"})
+        out.sample("railway_frames_dropped_total", s.source.stats.get("source_dropped_frames", 0),
+                   {"stream": stream_id, "reason": "source"})
+        out.sample("railway_frames_dropped_total", hub["ws_dropped_frames"],
+                   {"stream": stream_id, "reason": "client"})
+
+    out.declare("railway_uploads_total", "counter", "Uploaded videos queued for processing.")
+    out.sample("railway_uploads_total", uploads_total.value)
+
+    out.declare("railway_errors_total", "counter", "Errors by component.")
+    for stream_id, s in streams:
+        out.sample("railway_errors_total", s.stats["errors"],
+                   {"component": "stream", "stream": stream_id})
+        if s.detect_stage is not None:
+            out.sample("railway_errors_total", s.detect_stage.stats["detect_errors"],
+                       {"component": "detect", "stream": stream_id})
+    out.sample("railway_errors_total", jobs.failed_total.value, {"component": "jobs"})
+    for kind, batcher in batchers.items():
+        out.sample("railway_errors_total", batcher.stats["errors"],
+                   {"component": f"process_{kind}"})
+
+    out.declare("railway_queue_depth", "gauge", "Items waiting in a queue.")
+    for stream_id, s in streams:
+        out.sample("railway_queue_depth", s.source.stats.get("source_queue_depth", 0),
+                   {"stream": stream_id, "queue": "source"})
+        out.sample("railway_queue_depth", s.frame_queue.qsize(),
+                   {"stream": stream_id, "queue": "output"})
+        if s.detect_stage is not None:
+            out.sample("railway_queue_depth", s.detect_stage.queue.qsize(),
+                       {"stream": stream_id, "queue": "detect"})
+    out.sample("railway_queue_depth", jobs.stats()[QUEUED], {"queue": "jobs"})
+    for kind, batcher in batchers.items():
+        out.sample("railway_queue_depth", len(batcher.pending), {"queue": f"process_{kind}"})
+
+    out.declare("railway_websocket_clients", "gauge", "Connected WebSocket clients.")
+    for stream_id, s in streams:
+        out.sample("railway_websocket_clients", len(s.hub.subscribers),
+                   {"stream": stream_id, "channel": "frames"})
+    out.sample("railway_websocket_clients", len(manager.events.subscribers), {"channel": "events"})
+
+    out.declare("process_resident_memory_bytes", "gauge",
+                "Resident set size of the server process.")
+    out.sample("process_resident_memory_bytes", resident_memory_bytes())
+
+    return Response(out.render(), media_type=MetricsText.CONTENT_TYPE)
+
+@app.get("/streams")
+def list_streams():
+    return manager.stats()
+
+@app.post("/streams/{stream_id}")
+def add_stream(stream_id: str, uri: str, weight: int = 1):
+    """
+    Adds a camera stream from an image directory, video file, device index
+    or URL. Plain def: opening the source blocks, so it runs in the threadpool.
+    """
+    if stream_id == "events":
+        raise HTTPException(status_code=400, detail="'events' is reserved for /ws/events")
+    try:
+        manager.add_stream(stream_id, source=uri, weight=weight)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "Stream added", "stream_id": stream_id}
+
+@app.delete("/streams/{stream_id}")
+def remove_stream(stream_id: str):
+    if stream_id == DEFAULT_STREAM:
+        raise HTTPException(status_code=400, detail="The default stream cannot be removed")
+    if not manager.remove_stream(stream_id):
+        raise HTTPException(status_code=404, detail=f"Unknown stream {stream_id}")
+    return {"status": "Stream removed", "stream_id": stream_id}
+
+@app.get("/frames/{frame_id}/{variant}")
+def get_frame(frame_id: int, variant: str, stream_id: str = DEFAULT_STREAM):
+    """Full-resolution original/enhanced image for a frame id seen on /ws."""
+    if variant not in ("original", "enhanced"):
+        raise HTTPException(status_code=400, detail="variant must be 'original' or 'enhanced'")
+    get_streamer(stream_id)  # 404 for unknown streams
+    cached = frame_cache.get(stream_id, frame_id, variant)
+    if cached is None:
+        raise HTTPException(status_code=404, detail=f"Frame {frame_id} is no longer cached")
+    data, mime_type = cached
+    return Response(content=data, media_type=mime_type)
+
+def require_admin(request: Request):
+    """Admin routes need ADMIN_TOKEN, or a local client when no token is configured."""
+    if ADMIN_TOKEN:
+        if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+            raise HTTPException(status_code=401, detail="Invalid admin token")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=403,
+                            detail="Admin routes are local-only without ADMIN_TOKEN")
+
+def resolve_checkpoint(model_path):
+    """Resolves `model_path` inside MODEL_DIR; anything outside it is rejected."""
+    model_dir = os.path.realpath(MODEL_DIR)
+    path = os.path.realpath(os.path.join(model_dir, model_path))
+    if os.path.commonpath([model_dir, path]) != model_dir:
+        raise HTTPException(status_code=400, detail=f"Checkpoints must be inside {MODEL_DIR}")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Checkpoint not found: {model_path}")
+    return path
+
+@app.get("/admin/model", dependencies=[Depends(require_admin)])
+def get_model_status():
+    return manager.reload_status
+
+@app.post("/admin/model/reload", dependencies=[Depends(require_admin)])
+def reload_model(model_path: str, backend: str = None):
+    """
+    Loads a new checkpoint from MODEL_DIR in the background, warms it up at
+    the live frame shape and swaps it in between frames. Poll GET
+    /admin/model for progress.
+    """
+    model_path = resolve_checkpoint(model_path)
+    model_backend = backend or MODEL_BACKEND
+    options = {"model_size": NAFNET_MODEL_SIZE} if model_backend == "nafnet" else None
+    if not manager.reload_model(model_path, model_backend, options):
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    return {"status": "Reload started", **manager.reload_status}
+
+@app.post("/admin/model/rollback", dependencies=[Depends(require_admin)])
+def rollback_model():
+    try:
+        manager.rollback_model()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "Rolled back", **manager.reload_status}
+
+def get_event_log(stream_id):
+    log = get_streamer(stream_id).event_log
+    if log is None:
+        raise HTTPException(status_code=404, detail="Event log is disabled")
+    return log
+
+@app.get("/events/{stream_id}")
+def list_events(stream_id: str, since: float = None, until: float = None, limit: int = 100):
+    """Logged per-frame results (without thumbnails) between two unix timestamps."""
+    records = get_event_log(stream_id).read(since, until, thumbnails=False)
+    return list(itertools.islice(records, max(0, limit)))
+
+@app.post("/stream/source")
+def set_stream_source(uri: str, realtime: bool = True, stream_id: str = DEFAULT_STREAM):
+    """Switches a live stream to a video file, device index or network URL."""
+    target = get_streamer(stream_id)
+    if not target.open_video(uri, realtime=realtime):
+        raise HTTPException(status_code=400, detail=f"Could not open video source {uri}")
+    return {"status": "Stream updated", "source": target.source.stats["source"]}
+
+# Uploaded videos still needed by a queued or running job
+active_uploads = set()
+uploads_total = Counter()
+
+def _remove_old_uploads(keep_path):
+    for name in os.listdir(UPLOAD_VIDEO_DIR):
+        path = os.path.join(UPLOAD_VIDEO_DIR, name)
+        path = os.path.abspath(path)
+        if path != os.path.abspath(keep_path) and path not in active_uploads:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Could not remove old upload {path}: {e}")
+
+def _stream_upload(feed, video_path, is_complete=None):
+    """Once ingest is done, keep showing the upload by looping the file."""
+    if streamer.source is feed:
+        streamer.open_video(video_path, is_complete=is_complete, idle_timeout=UPLOAD_IDLE_TIMEOUT)
+
+def process_upload(job, video_path, processed_name, is_complete=None):
+    """
+    Upload job: decodes the video once and fans every frame out to the
+    YOLO-annotated writer, the frame sink for mod_train and the live stream.
+    is_complete is set while the file is still being uploaded.
+    """
+    processed_dir = os.path.join("backend/static/processed_videos", processed_name)
+    processed_url = f"http://localhost:8000/static/processed_videos/{processed_name}"
+    playlist_url = f"{processed_url}/{PLAYLIST_NAME}"
+    video_url = f"{processed_url}/{VIDEO_NAME}"
+
+    def on_ready(writer):
+        # Published while the job is still running, so reviewers can start watching
+        job.result = {"playlist_url": playlist_url, "video_url": video_url}
+
+    # One frame directory per job, since jobs may run concurrently
+    output_dir = os.path.join(os.getcwd(), UPLOAD_FRAMES_DIR, job.id)
+
+    feed = PushSource(os.path.basename(video_path),
+                      on_finish=lambda source: _stream_upload(source, video_path, is_complete))
+    streamer.set_source(feed)
+
+    print("Processing video with YOLO model and extracting frames...")
+    sink = FrameSink(output_dir)
+    # Using absolute path for output to ensure the writer finds it
+    annotated = AnnotatedVideoWriter(os.path.abspath(processed_dir), MODEL_PATH,
+                                     PROCESSED_SEGMENT_SECONDS, on_ready=on_ready)
+    fanout = FrameFanout(video_path, [annotated, sink, StreamFeed(feed)],
+                         queue_size=UPLOAD_FANOUT_QUEUE, is_complete=is_complete,
+                         check_cancelled=job.update, idle_timeout=UPLOAD_IDLE_TIMEOUT,
+                         progress=lambda done, total: job.update(done, total, stage="ingest"))
+    num_frames = fanout.run()
+    if "yolo" in fanout.errors:
+        print(f"Error processing video: {fanout.errors['yolo']}")
+        playlist_url = video_url = None
+    elif not annotated.writer.progressive:
+        playlist_url = None
+
+    # Send frames to mod_train.py. It reads a directory, so it runs once
+    # the sink has written every frame rather than as a fanout consumer.
+    job.update(stage="mod_train")
+    try:
+        print("Sending frames to mod_train.py...")
+        mod_train.process_frames(output_dir)
+    except Exception as e:
+        print(f"Error processing frames in mod_train: {e}")
+
+    # Keep only the newest finished extraction
+    frames_root = os.path.join(os.getcwd(), UPLOAD_FRAMES_DIR)
+    for name in os.listdir(frames_root):
+        other = jobs.get(name)
+        if name != job.id and (other is None or other.state not in (QUEUED, RUNNING)):
+            shutil.rmtree(os.path.join(frames_root, name), ignore_errors=True)
+
+    job.update(num_frames, num_frames)
+    return {"frames_extracted": sink.count, "video_url": video_url, "playlist_url": playlist_url,
+            "stream_dropped_frames": fanout.dropped["stream"]}
+
+def start_upload(video_path, filename, is_complete=None):
+    """
+    Queues the post-processing job for an uploaded video. The default
+    stream switches to the video as soon as the job starts decoding it.
+    Returns the job.
+    """
+    # Used in a directory name and in ffmpeg's output spec, so keep it plain
+    stem = re.sub(r"[^\w.-]", "_", os.path.splitext(os.path.basename(filename))[0])
+    processed_name = f"processed_{stem}"
+    path = os.path.abspath(video_path)
+    try:
+        active_uploads.add(path)
+        # Released however the job ends, even if it is cancelled before it starts
+        job = jobs.submit(f"upload:{os.path.basename(filename)}", process_upload,
+                          video_path, processed_name, is_complete,
+                          cleanup=lambda: active_uploads.discard(path))
+    except RuntimeError as e:
+        active_uploads.discard(path)
+        raise HTTPException(status_code=503, detail=str(e))
+    uploads_total.inc()
+    _remove_old_uploads(video_path)
+    return job
 
 @app.post("/upload_video")
-async def upload_video(file: UploadFile = File(...)):
+def upload_video(file: UploadFile = File(...)):
+    """
+    Saves the video and queues its processing as a job; the default stream
+    shows the video while the job decodes it. Poll GET /jobs/{job_id}.
+    Multipart bodies are received in full before this runs; large files
+    should use the chunked /uploads API instead. Plain def, so copying the
+    file to disk runs in the threadpool.
+    """
     try:
         # Define paths
-        temp_video_path = f"temp_{file.filename}"
-        output_dir = os.path.join(os.getcwd(), "uploaded_frames")
-        
-        # Define processed video path
-        processed_filename = f"processed_{file.filename}"
-        processed_video_path = os.path.join("backend/static/processed_videos", processed_filename)
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(processed_video_path), exist_ok=True)
-        
+        os.makedirs(UPLOAD_VIDEO_DIR, exist_ok=True)
+        video_path = os.path.join(UPLOAD_VIDEO_DIR, os.path.basename(file.filename))
+
         # Save uploaded video
-        with open(temp_video_path, "wb") as buffer:
+        with open(video_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
-            
-        # 1. Process with YOLO
-        print("Processing video with YOLO model...")
-        try:
-             # Using absolute path for output to ensure cv2 writes correctly
-            abs_processed_path = os.path.abspath(processed_video_path)
-            process_video_with_yolo(temp_video_path, abs_processed_path, MODEL_PATH)
-            video_url = f"http://localhost:8000/static/processed_videos/{processed_filename}"
-        except Exception as e:
-            print(f"Error processing video: {e}")
-            video_url = None
-
-        # 2. Extract frames (keeping existing logic for legacy/compatibility)
-        if os.path.exists(output_dir):
-            shutil.rmtree(output_dir)
-        os.makedirs(output_dir)
-        
-        num_frames = extract_frames_from_video(temp_video_path, output_dir)
-        
-        # Cleanup video file
-        os.remove(temp_video_path)
-        
-        # Send frames to mod_train.py
-        try:
-            print("Sending frames to mod_train.py...")
-            mod_train.process_frames(output_dir)
-        except Exception as e:
-             print(f"Error processing frames in mod_train: {e}")
-
-        # Update Streamer
-        success = streamer.reload_images(output_dir)
-        
-        if not success:
-             print("Warning: Failed to load images from extracted video into streamer")
-             # Don't raise error, as video processing might have succeeded
 
+        job = start_upload(video_path, file.filename)
         return {
-            "message": "Video processed successfully",
-            "frames_extracted": num_frames,
-            "status": "Stream updated",
-            "video_url": video_url
+            "message": "Video queued for processing",
+            "job_id": job.id,
+            "job_url": f"/jobs/{job.id}",
+            "status": "Stream switches to the video when processing starts",
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/uploads")
+def create_upload(filename: str, size: int):
+    """Starts a resumable upload of `size` bytes. Send the bytes with PUT /uploads/{upload_id}."""
+    try:
+        session = uploads.create(filename, size)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    active_uploads.add(os.path.abspath(session.path))
+    return session.to_dict()
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+@app.get("/uploads/{upload_id}")
+def get_upload(upload_id: str):
+    """Upload state; `received` is the offset to resume from."""
+    session = uploads.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown upload {upload_id}")
+    return session.to_dict()
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int):
+    """
+    Appends the raw request body at `offset`. Decoding (live stream and the
+    post-processing job) starts once UPLOAD_START_MB have arrived and tails
+    the spool file while the rest is still being sent.
+
+    The final chunk is refused with 503 while the job queue is full, since
+    nothing could process the upload afterwards. If the queue fills up in
+    between, the bytes are kept: retry with an empty PUT at offset=size.
+    """
+    session = uploads.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown upload {upload_id}")
+    length = request.headers.get("content-length")
+    completes = length is not None and offset + int(length) >= session.size
+    if completes and not session.started and jobs.full():
+        raise HTTPException(status_code=503, headers={"Retry-After": "5"},
+                            detail="Processing queue is full, retry the last chunk later")
+
+    loop = asyncio.get_running_loop()
+    position = offset
+    try:
+        # Written as it is received, so a chunk is never held in memory whole
+        async for piece in request.stream():
+            if piece:
+                await loop.run_in_executor(None, session.write, position, piece)
+                position += len(piece)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=f"{e} (received {session.received})")
+
+    if uploads.should_start(session):
+        try:
+            job = start_upload(session.path, session.filename, is_complete=session.finished)
+            session.job_id = job.id
+        except HTTPException as e:
+            # Job queue full: the bytes are stored, try again on the next PUT
+            print(f"Could not start processing upload {upload_id}: {e.detail}")
+            session.started = False
+            if session.complete:
+                detail = f"{e.detail}; retry with an empty PUT at offset={session.size}"
+                raise HTTPException(status_code=503, headers={"Retry-After": "5"}, detail=detail)
+    return session.to_dict()
+
+@app.get("/jobs")
+def list_jobs():
+    return [job.to_dict() for job in reversed(list(jobs.jobs.values()))]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Job state and progress: frames done/total, fps and ETA; the result once done."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail=f"No active job {job_id}")
+    return {"status": "Cancelling", "job_id": job_id}
+
+# Documented in docs/API_REFERENCE.md under /api/v1; also served at the root
+api = APIRouter()
+
+async def run_batched(kind, image):
+    """Decodes an uploaded image and waits for its result from the batcher."""
+    if kind == "deblur" and not manager.ready:
+        raise HTTPException(status_code=503, detail="The deblur model is still loading")
+    try:
+        frame = decode_image(await image.read())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        future = batchers[kind].submit(frame)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    try:
+        return await asyncio.wrap_future(future)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def save_deblurred(image):
+    os.makedirs(DEBLUR_OUTPUT_DIR, exist_ok=True)
+    filename = f"deblurred_{uuid.uuid4().hex[:12]}.jpg"
+    cv2.imwrite(os.path.join(DEBLUR_OUTPUT_DIR, filename), image)
+    paths = [os.path.join(DEBLUR_OUTPUT_DIR, name) for name in os.listdir(DEBLUR_OUTPUT_DIR)]
+    if len(paths) > DEBLUR_OUTPUT_KEEP:
+        for path in sorted(paths, key=os.path.getmtime)[:len(paths) - DEBLUR_OUTPUT_KEEP]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return filename
+
+@api.post("/process/deblur")
+async def process_deblur(image: UploadFile = File(...)):
+    """Deblurs one image with the live model; the result is served from /static."""
+    start = time.time()
+    deblurred = await run_batched("deblur", image)
+    filename = await asyncio.get_running_loop().run_in_executor(None, save_deblurred, deblurred)
+    return {
+        "success": True,
+        "deblurred_image_url": f"/static/{os.path.basename(DEBLUR_OUTPUT_DIR)}/{filename}",
+        "psnr": None,  # No sharp reference for uploaded images
+        "ssim": None,
+        "processing_time_ms": round((time.time() - start) * 1000),
+    }
+
+@api.post("/process/detect")
+async def process_detect(image: UploadFile = File(...)):
+    """YOLOv8 detections for one image."""
+    detections = await run_batched("detect", image)
+    return {
+        "success": True,
+        "detections": [{"class": d["label"], "confidence": d["confidence"], "bbox": d["bbox"]}
+                       for d in detections],
+        "count": len(detections),
+    }
+
+@api.post("/process/ocr")
+async def process_ocr(image: UploadFile = File(...)):
+    """Wagon numbers read from the wagons detected in one image."""
+    wagons = await run_batched("ocr", image)
+    return {
+        "success": True,
+        "wagon_numbers": [{"text": w["ocr_text"], "confidence": w["ocr_conf"], "bbox": w["bbox"]}
+                          for w in wagons],
+    }
+
+app.include_router(api)
+app.include_router(api, prefix="/api/v1")
+
+
+async def stream_to_client(websocket: WebSocket, target, protocol):
+    # Clients opt into raw-JPEG binary frames with ?protocol=binary
+    binary = protocol == PROTOCOL_BINARY
     await websocket.accept()
+    sub = target.hub.subscribe(PROTOCOL_BINARY if binary else PROTOCOL_JSON)
     try:
         while True:
-            if streamer.latest_frame_data:
-                await websocket.send_json(streamer.latest_frame_data)
-            await asyncio.sleep(0.05) # Send at approx 20fps
+            # Only new frames are delivered; a slow client drops its oldest pending frame
+            message = await sub.get()
+            if binary:
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_text(message)
     except WebSocketDisconnect:
         print("Client disconnected")
+    finally:
+        target.hub.unsubscribe(sub)
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, protocol: str = PROTOCOL_JSON):
+    await stream_to_client(websocket, streamer, protocol)
+
+# Registered before /ws/{stream_id} so it is not taken for a stream id
+@app.websocket("/ws/events")
+async def events_websocket_endpoint(websocket: WebSocket, stream_id: str = None, label: str = None,
+                                    min_confidence: float = 0.0, types: str = None):
+    """
+    Compact JSON events (detections, wagon numbers, blur scores, stage
+    timings) without images. stream_id, label and types take comma-separated
+    lists; min_confidence drops weaker detections.
+    """
+    await websocket.accept()
+    sub = manager.events.subscribe(EventFilter(stream_id, label, min_confidence, types))
+    try:
+        while True:
+            await websocket.send_text(await sub.get())
+    except WebSocketDisconnect:
+        print("Events client disconnected")
+    finally:
+        manager.events.unsubscribe(sub)
+
+@app.websocket("/ws/{stream_id}")
+async def stream_websocket_endpoint(websocket: WebSocket, stream_id: str,
+                                    protocol: str = PROTOCOL_JSON):
+    target = manager.get(stream_id)
+    if target is None:
+        await websocket.close(code=4404)
+        return
+    await stream_to_client(websocket, target, protocol)
+
+@app.websocket("/ws/replay/{stream_id}")
+async def replay_websocket_endpoint(websocket: WebSocket, stream_id: str, since: float = None,
+                                    until: float = None, speed: float = 1.0,
+                                    thumbnails: bool = True):
+    """
+    Replays logged frames from the event log, spaced by their original
+    timestamps divided by `speed` (speed=0 sends as fast as possible).
+    """
+    target = manager.get(stream_id)
+    if target is None or target.event_log is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    records = target.event_log.read(since, until, thumbnails)
+    previous = None
+    try:
+        while True:
+            # Disk reads happen off the event loop, a few records at a time
+            chunk = await loop.run_in_executor(None, lambda: list(itertools.islice(records, 32)))
+            if not chunk:
+                break
+            for record in chunk:
+                if speed > 0 and previous is not None:
+                    await asyncio.sleep(max(0.0, record["timestamp"] - previous) / speed)
+                previous = record["timestamp"]
+                await websocket.send_json(replay_payload(record))
+        await websocket.close()
+    except WebSocketDisconnect:
+        print("Replay client disconnected")
 
 if __name__ == "__main__":
     import uvicorn
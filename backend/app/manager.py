@@ -0,0 +1,295 @@
+import asyncio
+import os
+import time
+import threading
+import torch
+from app.backends import create_backend
+from app.streamer import VideoStreamer
+from app.events import EventBus
+
+
+class SharedModelRunner:
+    """
+    Serializes forward passes from several streams through one model backend.
+
+    Each stream's worker thread calls infer() and blocks until its batch has
+    been run. When several streams are waiting, the next one is picked by
+    smooth weighted round-robin, so a stream with weight 2 gets twice the
+    forwards of a stream with weight 1 and nobody starves.
+    """
+
+    def __init__(self, backend, device, num_threads=None):
+        self.backend = backend
+        self.device = device
+        self.num_threads = num_threads  # Intra-op budget of the model thread
+        self.weights = {}
+        self.current = {}
+        self.pending = {}  # stream_id -> request dict
+        self.stats = {}
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, name="shared-model", daemon=True)
+        self._thread.start()
+
+    def register(self, stream_id, weight=1):
+        with self._cond:
+            self.weights[stream_id] = max(1, int(weight))
+            self.current[stream_id] = 0
+            self.stats[stream_id] = {"weight": self.weights[stream_id], "forwards": 0, "frames": 0,
+                                     "queue_wait_ms": 0}
+
+    def unregister(self, stream_id):
+        with self._cond:
+            self.weights.pop(stream_id, None)
+            self.current.pop(stream_id, None)
+            self.stats.pop(stream_id, None)
+            request = self.pending.pop(stream_id, None)
+            if request is not None:
+                request["error"] = RuntimeError(f"Stream {stream_id} was removed")
+                request["done"].set()
+
+    def infer(self, stream_id, batch, backend=None):
+        """
+        Runs `batch` through the shared model. Returns (output, forward_time).
+        `backend` is the one the batch was prepared with; it is used even if
+        the model was swapped while the batch was waiting.
+        """
+        request = {"batch": batch, "backend": backend or self.backend, "queued_at": time.time(),
+                   "done": threading.Event(), "output": None, "inf_time": 0, "error": None}
+        with self._cond:
+            if stream_id not in self.weights:
+                raise RuntimeError(f"Stream {stream_id} is not registered")
+            self.pending[stream_id] = request
+            self._cond.notify()
+        request["done"].wait()
+        if request["error"] is not None:
+            raise request["error"]
+        return request["output"], request["inf_time"]
+
+    def _pick(self):
+        # Smooth weighted round-robin over streams that have a batch waiting
+        total = 0
+        best = None
+        for stream_id in self.pending:
+            self.current[stream_id] += self.weights[stream_id]
+            total += self.weights[stream_id]
+            if best is None or self.current[stream_id] > self.current[best]:
+                best = stream_id
+        self.current[best] -= total
+        return best
+
+    def _loop(self):
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        while True:
+            with self._cond:
+                while not self.pending:
+                    self._cond.wait()
+                stream_id = self._pick()
+                request = self.pending.pop(stream_id)
+
+            start = time.time()
+            try:
+                request["output"] = request["backend"].forward(request["batch"])
+            except Exception as e:
+                request["error"] = e
+            request["inf_time"] = time.time() - start
+
+            stats = self.stats.get(stream_id)
+            if stats is not None:
+                stats["forwards"] += 1
+                stats["frames"] += request["batch"].shape[0]
+                wait_ms = (start - request["queued_at"]) * 1000
+                stats["queue_wait_ms"] = (stats["queue_wait_ms"] * 0.9) + (wait_ms * 0.1)
+            request["done"].set()
+
+    def swap(self, backend):
+        """Makes `backend` serve all new batches. Returns the previous one."""
+        with self._cond:
+            old, self.backend = self.backend, backend
+        return old
+
+
+class StreamManager:
+    """
+    Runs several named VideoStreamers (one per camera) against a single
+    shared model instance, so memory stays flat as cameras are added.
+    model_backend picks the network: "unet", "nafnet" or "onnx" (app/backends.py).
+
+    stream_options: optional callable(stream_id) -> dict of extra
+    VideoStreamer keyword arguments (encoders, frame cache, batching...).
+    Per-stream objects such as encoders must not be shared between streams.
+
+    lazy: do not load the model yet; call load_model() (e.g. on a
+    background thread) before start(). Until then `ready` is False.
+    """
+
+    def __init__(self, model_path=None, device="cpu", stream_options=None, model_backend="unet",
+                 backend_options=None, intra_op_threads=None, lazy=False):
+        self.device = device
+        self.backend_options = backend_options
+        self.backend = None
+        if not lazy:
+            self.backend = create_backend(model_backend, model_path, device,
+                                          **(backend_options or {}))
+        self.runner = SharedModelRunner(self.backend, device, intra_op_threads)
+        self.events = EventBus()  # Shared /ws/events channel for every stream
+
+        # Hot reload: a new checkpoint is loaded and warmed up next to the
+        # live one, then swapped in between batches. The replaced backend is
+        # kept for rollback (so both stay in memory).
+        self.model_path = model_path
+        self.model_backend = model_backend
+        self.previous = None  # (backend, model_path, model_backend)
+        self.reload_status = {"state": "idle", "model_path": model_path, "backend": model_backend,
+                              "error": None, "started_at": None, "swapped_at": None}
+        self._reload_lock = threading.Lock()
+        self.stream_options = stream_options or (lambda stream_id: {})
+        self.streams = {}
+        self.tasks = {}
+        self.loop = None  # The event loop the stream tasks run on, set by start()
+        self.started = False
+
+    @property
+    def ready(self):
+        return self.runner.backend is not None
+
+    def load_model(self, warmup_shape=(720, 1280), batch_size=1):
+        """
+        Loads the configured checkpoint and runs a warm-up forward on a
+        dummy frame of `warmup_shape` before streams can use it. Used with
+        lazy=True; a model loaded (or reloaded) in the meantime is kept.
+        """
+        backend = create_backend(self.model_backend, self.model_path, self.device,
+                                 **(self.backend_options or {}))
+        backend.warmup(warmup_shape, batch_size)
+        with self._reload_lock:
+            if self.runner.backend is None:
+                self.runner.swap(backend)
+                self.backend = backend
+        return self.runner.backend
+
+    def add_stream(self, stream_id, dataset_path=None, source=None, weight=1):
+        """
+        Adds a stream reading either a dataset folder (DATASET_PATH layout) or
+        a live source: image directory, video file, device index or URL.
+        """
+        if stream_id in self.streams:
+            raise ValueError(f"Stream {stream_id} already exists")
+
+        self.runner.register(stream_id, weight)
+        try:
+            streamer = VideoStreamer(dataset_path, device=self.device, runner=self.runner,
+                                     stream_id=stream_id, event_bus=self.events,
+                                     **self.stream_options(stream_id))
+            if source is not None:
+                if os.path.isdir(str(source)):
+                    ok = streamer.reload_images(source)
+                else:
+                    ok = streamer.open_video(source)
+                if not ok:
+                    raise ValueError(f"Could not open source {source} for stream {stream_id}")
+        except Exception:
+            self.runner.unregister(stream_id)
+            raise
+
+        self.streams[stream_id] = streamer
+        if self.started:
+            # Called from a request thread, not the loop the streams run on
+            self.tasks[stream_id] = asyncio.run_coroutine_threadsafe(streamer.start_stream(),
+                                                                     self.loop)
+        return streamer
+
+    def remove_stream(self, stream_id):
+        streamer = self.streams.pop(stream_id, None)
+        if streamer is None:
+            return False
+        streamer.close()
+        self.runner.unregister(stream_id)
+        task = self.tasks.pop(stream_id, None)
+        if task is not None:
+            self.loop.call_soon_threadsafe(task.cancel)
+        return True
+
+    def get(self, stream_id):
+        return self.streams.get(stream_id)
+
+    def start(self):
+        """
+        Starts every stream. Must be called from the running event loop;
+        add_stream() and remove_stream() may then be called from any thread.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.started = True
+        for stream_id, streamer in self.streams.items():
+            if stream_id not in self.tasks:
+                self.tasks[stream_id] = asyncio.create_task(streamer.start_stream())
+
+    def warmup_shapes(self):
+        """Frame shapes (h, w) currently being served, or a 720p default."""
+        shapes = {s.frame_shape for s in self.streams.values() if s.frame_shape is not None}
+        return sorted(shapes) or [(720, 1280)]
+
+    def reload_model(self, model_path, model_backend=None, backend_options=None):
+        """
+        Loads `model_path` on a background thread, warms it up at every live
+        stream's frame shape and batch size, then swaps it in. Returns False
+        if a reload is already running. Progress is in reload_status.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        model_backend = model_backend or self.model_backend
+        self.reload_status.update(state="loading", model_path=model_path, backend=model_backend,
+                                  error=None, started_at=time.time())
+        thread = threading.Thread(target=self._reload,
+                                  args=(model_path, model_backend, backend_options),
+                                  name="model-reload", daemon=True)
+        thread.start()
+        return True
+
+    def _reload(self, model_path, model_backend, backend_options):
+        try:
+            if not model_path or not os.path.exists(model_path):
+                raise FileNotFoundError(f"Checkpoint not found: {model_path}")
+            backend = create_backend(model_backend, model_path, self.device,
+                                     **(backend_options or {}))
+
+            self.reload_status["state"] = "warming"
+            batch_size = max([s.max_batch_size for s in self.streams.values()] or [1])
+            for shape in self.warmup_shapes():
+                backend.warmup(shape, batch_size)
+
+            self._swap(backend, model_path, model_backend)
+            print(f"Model reloaded from {model_path} ({model_backend})")
+        except Exception as e:
+            print(f"Model reload failed, keeping the current model: {e}")
+            self.reload_status.update(state="failed", error=str(e))
+        finally:
+            self._reload_lock.release()
+
+    def _swap(self, backend, model_path, model_backend):
+        old = self.runner.swap(backend)
+        self.previous = (old, self.model_path, self.model_backend)
+        self.model_path, self.model_backend = model_path, model_backend
+        for streamer in list(self.streams.values()):
+            streamer.on_model_swapped()
+        self.reload_status.update(state="ready", model_path=model_path, backend=model_backend,
+                                  swapped_at=time.time())
+
+    def rollback_model(self):
+        """Swaps the previous model back in. Raises RuntimeError if it cannot."""
+        if not self._reload_lock.acquire(blocking=False):
+            raise RuntimeError("A model reload is in progress")
+        try:
+            if self.previous is None or self.previous[0] is None:
+                raise RuntimeError("No previous model to roll back to")
+            backend, model_path, model_backend = self.previous
+            self._swap(backend, model_path, model_backend)
+            self.reload_status["state"] = "rolled_back"
+        finally:
+            self._reload_lock.release()
+
+    def stats(self):
+        return {
+            stream_id: {**streamer.get_stats(), "scheduler": self.runner.stats.get(stream_id, {})}
+            for stream_id, streamer in self.streams.items()
+        }
@@ -0,0 +1,180 @@
+"""
+Progressive output for processed videos.
+
+ProgressiveVideoWriter pipes frames into ffmpeg, which encodes them once
+(H.264) and writes two outputs through its tee muxer:
+
+    index.m3u8 + segment_*.m4s   HLS event playlist, playable while it grows
+    video.mp4                    fragmented MP4 of the same stream
+
+Without ffmpeg it falls back to cv2.VideoWriter (mp4v), which is only
+playable once the whole file has been written.
+
+RangeStaticFiles is the /static mount with HTTP range requests, so players
+can seek in (and keep fetching) files that are still being written.
+"""
+import mimetypes
+import os
+import shutil
+import subprocess
+import cv2
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/iso.segment", ".m4s")
+
+PLAYLIST_NAME = "index.m3u8"
+VIDEO_NAME = "video.mp4"
+
+
+def ffmpeg_available():
+    return shutil.which("ffmpeg") is not None
+
+
+class ProgressiveVideoWriter:
+    """
+    Writes BGR frames to `output_dir`. The writer starts on the first frame,
+    when the size is known. ready() turns true once the first HLS segment
+    is listed in the playlist, i.e. when playback can start.
+    """
+
+    def __init__(self, output_dir, fps=25.0, segment_seconds=2):
+        self.output_dir = output_dir
+        self.fps = fps or 25.0
+        self.segment_seconds = segment_seconds
+        self.progressive = ffmpeg_available()
+        self.proc = None
+        self.out = None
+        self._ready = False
+        # Start from an empty directory; stale segments would end up in the playlist
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir, exist_ok=True)
+        if not self.progressive:
+            print("ffmpeg not found; processed videos are written as plain MP4")
+
+    @property
+    def playlist_path(self):
+        return os.path.join(self.output_dir, PLAYLIST_NAME) if self.progressive else None
+
+    @property
+    def video_path(self):
+        return os.path.join(self.output_dir, VIDEO_NAME)
+
+    def _start(self, width, height):
+        if not self.progressive:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            self.out = cv2.VideoWriter(self.video_path, fourcc, self.fps, (width, height))
+            return
+        gop = max(1, int(round(self.fps * self.segment_seconds)))
+        hls = ":".join([
+            "f=hls",
+            f"hls_time={self.segment_seconds}",
+            "hls_playlist_type=event",
+            "hls_segment_type=fmp4",
+            "hls_flags=temp_file+independent_segments",
+            "hls_segment_filename=segment_%05d.m4s",
+        ])
+        mp4 = "f=mp4:movflags=frag_keyframe+empty_moov+default_base_moof"
+        cmd = [
+            "ffmpeg", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+            "-r", f"{self.fps:.3f}", "-i", "-",
+            "-map", "0:v", "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+            "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+            # Fixed GOP so every segment starts on a keyframe
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-flags", "+global_header",
+            # Relative names, run from output_dir: the tee spec treats ':', '|', '['
+            # and '\' specially, and any of them can appear in an absolute path
+            "-f", "tee", f"[{hls}]{PLAYLIST_NAME}|[{mp4}]{VIDEO_NAME}",
+        ]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, cwd=self.output_dir)
+
+    def write(self, frame):
+        if self.proc is None and self.out is None:
+            height, width = frame.shape[:2]
+            self._start(width, height)
+        if self.out is not None:
+            self.out.write(frame)
+        else:
+            self.proc.stdin.write(frame.tobytes())  # Blocks while ffmpeg catches up
+
+    def ready(self):
+        if self._ready or self.proc is None:
+            return self._ready
+        try:
+            with open(self.playlist_path) as f:
+                self._ready = "#EXTINF" in f.read()
+        except OSError:
+            pass
+        return self._ready
+
+    def release(self):
+        if self.out is not None:
+            self.out.release()
+        if self.proc is not None:
+            self.proc.stdin.close()
+            if self.proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg exited with code {self.proc.returncode}")
+
+
+def _read_range(path, start, end, chunk_size=64 * 1024):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def _parse_range(value, size):
+    """Parses a single `bytes=start-end` range. Returns (start, end) or None if unsatisfiable."""
+    unit, _, spec = value.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = max(0, size - int(last))  # Suffix range: the last N bytes
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+class RangeStaticFiles(StaticFiles):
+    """StaticFiles answering `Range: bytes=...` with 206 partial content."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        range_header = Headers(scope=scope).get("range")
+        if status_code != 200 or not range_header:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers["Accept-Ranges"] = "bytes"
+            if str(full_path).endswith(".m3u8"):
+                response.headers["Cache-Control"] = "no-cache"  # Playlist grows while processing
+            return response
+
+        size = stat_result.st_size
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Content-Length": str(end - start + 1),
+        }
+        return StreamingResponse(_read_range(full_path, start, end), status_code=206,
+                                 media_type=media_type, headers=headers)
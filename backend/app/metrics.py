@@ -0,0 +1,123 @@
+"""
+Prometheus text exposition for /metrics.
+
+Histogram and Counter are updated from pipeline threads without taking a
+lock: every thread writes to its own shard, and a scrape adds the shards
+up. The shard list lock is only taken the first time a thread records.
+"""
+import bisect
+import itertools
+import os
+import threading
+
+# Seconds; covers per-frame stages from sub-millisecond encodes to slow CPU inference
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _Sharded:
+    def __init__(self, width):
+        self.width = width
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0] * self.width
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _totals(self):
+        totals = [0] * self.width
+        for shard in list(self._shards):
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    """Monotonic counter."""
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    @property
+    def value(self):
+        return self._totals()[0]
+
+
+class Histogram(_Sharded):
+    """Latency histogram with fixed upper bounds (seconds) plus +Inf."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(len(self.buckets) + 2)  # Bucket counts, +Inf, then the sum
+
+    def observe(self, seconds):
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, seconds)] += 1
+        shard[-1] += seconds
+
+    def snapshot(self):
+        """Returns (cumulative counts per bucket including +Inf, sum)."""
+        totals = self._totals()
+        return list(itertools.accumulate(totals[:-1])), totals[-1]
+
+
+def resident_memory_bytes():
+    """Current RSS of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsText:
+    """
+    Builds a text exposition. Declare a family, then add its samples;
+    Prometheus expects each family's samples to be contiguous.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.lines = []
+
+    def declare(self, name, kind, help_text):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name, value, labels=None):
+        if value is None:
+            return
+        value = value if isinstance(value, int) else repr(float(value))
+        self.lines.append(f"{name}{_labels(labels)} {value}")
+
+    def histogram(self, name, histogram, labels=None):
+        labels = labels or {}
+        cumulative, total = histogram.snapshot()
+        for bound, count in zip(histogram.buckets + ("+Inf",), cumulative):
+            le = bound if bound == "+Inf" else f"{bound:g}"
+            self.sample(f"{name}_bucket", count, {**labels, "le": le})
+        self.sample(f"{name}_count", cumulative[-1], labels)
+        self.sample(f"{name}_sum", total, labels)
+
+    def render(self):
+        return "\n".join(self.lines) + "\n"
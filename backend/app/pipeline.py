@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+import cv2
+import torch
+
+
+class StageWorker:
+    """
+    One pipeline stage on its own thread. Items are handed over through a
+    bounded queue (submit() blocks when the stage falls behind, so earlier
+    stages never run unboundedly ahead) and processed in order:
+    on_result(item, fn(item)).
+
+    num_threads sets the stage thread's intra-op budget with
+    torch.set_num_threads, so two stages running models side by side do not
+    both claim every core. With OpenMP builds of PyTorch the setting is per
+    thread.
+    """
+
+    def __init__(self, name, fn, on_result, num_threads=None, queue_size=2):
+        self.name = name
+        self.fn = fn
+        self.on_result = on_result
+        self.num_threads = num_threads
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.running = True
+        self.stats = {f"{name}_ms": 0, f"{name}_queue_depth": 0, f"{name}_errors": 0}
+        self._thread = threading.Thread(target=self._loop, name=f"stage-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        while self.running:
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _loop(self):
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        while self.running:
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            start = time.time()
+            try:
+                result = self.fn(item)
+            except Exception as e:
+                print(f"Error in {self.name} stage: {e}")
+                self.stats[f"{self.name}_errors"] += 1
+                result = None
+            elapsed_ms = (time.time() - start) * 1000
+            key = f"{self.name}_ms"
+            self.stats[key] = (self.stats[key] * 0.9) + (elapsed_ms * 0.1)
+            self.stats[f"{self.name}_queue_depth"] = self.queue.qsize()
+            self.on_result(item, result)
+
+    def drain(self):
+        """Discards queued items (e.g. after a source switch)."""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def shutdown(self):
+        self.running = False
+        self._thread.join(timeout=2)
+
+
+class FrameDetector:
+    """
+    Adapter from the streamer's RGB frames to PartsDetector (YOLOv8, BGR).
+    Returns the fields to attach to the frame: "detections" and, when
+    OCR ran, "wagon_numbers". No annotated image is drawn. `model` is the
+    processing.DetectProcessor behind /process/detect, so the streams and
+    the API share (and warm up) one YOLO instance, which DetectProcessor
+    locks around every forward.
+
+    ocr: optional processing.OCRProcessor. OCR is much slower than
+    detection, so it reads the wagons of at most one frame every
+    `ocr_interval` frames.
+    """
+
+    def __init__(self, model, ocr=None, ocr_interval=25):
+        self.model = model
+        self.ocr = ocr
+        self.ocr_interval = max(1, ocr_interval)
+        self._frames = 0
+        self._last_ocr = None
+        self._lock = threading.Lock()
+
+    def _ocr_due(self):
+        with self._lock:
+            self._frames += 1
+            if self._last_ocr is not None and self._frames - self._last_ocr < self.ocr_interval:
+                return False
+            self._last_ocr = self._frames
+            return True
+
+    def __call__(self, rgb):
+        bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        fields = {"detections": self.model.detect(bgr)}
+        if self.ocr is not None and fields["detections"] and self._ocr_due():
+            try:
+                fields["wagon_numbers"] = self.ocr.read_wagons(bgr, fields["detections"])
+            except Exception as e:
+                print(f"Error reading wagon numbers: {e}")
+        return fields
@@ -0,0 +1,84 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PrefetchDecoder:
+    """
+    Decodes the next `depth` frames on a thread pool so disk I/O and image
+    decoding overlap with model inference.
+
+    next_item: callable returning the next source key (e.g. a file path) or None
+    decode:    callable turning a key into a ready-to-use uint8 array
+    """
+
+    live = False
+
+    def __init__(self, next_item, decode, depth=4, workers=2):
+        self.next_item = next_item
+        self.decode = decode
+        self.depth = max(1, depth)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.pending = deque()
+        self._lock = threading.Lock()
+        self.stats = {"prefetch_depth": 0, "input_wait_ms": 0}
+
+    def _fill(self):
+        while len(self.pending) < self.depth:
+            key = self.next_item()
+            if key is None:
+                return
+            self.pending.append((key, self.executor.submit(self.decode, key)))
+
+    def get(self, timeout=None):
+        """
+        Returns the next decoded (key, frame) in source order, or None when
+        the source is empty. Frames that fail to decode are logged and skipped.
+        `timeout` is accepted for interface parity with live sources; files
+        are always available so it is not used.
+        """
+        while True:
+            with self._lock:
+                self._fill()
+                if not self.pending:
+                    return None
+                key, future = self.pending.popleft()
+                self.stats["prefetch_depth"] = sum(1 for _, f in self.pending if f.done())
+
+            wait_start = time.time()
+            try:
+                frame = future.result()
+            except Exception as e:
+                print(f"Error reading frame {key}: {e}")
+                continue
+            finally:
+                wait_ms = (time.time() - wait_start) * 1000
+                self.stats["input_wait_ms"] = (self.stats["input_wait_ms"] * 0.9) + (wait_ms * 0.1)
+                with self._lock:
+                    self._fill()  # Keep the pool busy while the caller runs inference
+            return key, frame
+
+    def skip(self, count):
+        """Discards the next `count` frames without handing them out."""
+        with self._lock:
+            skipped = 0
+            while skipped < count and self.pending:
+                _, future = self.pending.popleft()
+                future.cancel()
+                skipped += 1
+            while skipped < count and self.next_item() is not None:
+                skipped += 1
+            return skipped
+
+    def reset(self):
+        """Drops frames decoded from the previous source."""
+        with self._lock:
+            for _, future in self.pending:
+                future.cancel()
+            self.pending.clear()
+            self.stats["prefetch_depth"] = 0
+
+    def shutdown(self):
+        self.reset()
+        self.executor.shutdown(wait=False)
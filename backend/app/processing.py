@@ -0,0 +1,135 @@
+"""
+Batch functions behind /process/deblur, /process/detect and /process/ocr.
+Each takes a list of BGR images (one per request, grouped by a
+DynamicBatcher) and returns one result per image.
+"""
+import threading
+import cv2
+import numpy as np
+
+
+def decode_image(data):
+    """Encoded image bytes -> BGR array. Raises ValueError if they are not an image."""
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+
+def blank_image(shape):
+    """Black BGR frame of `shape` (h, w), for warm-up forwards."""
+    return np.zeros((shape[0], shape[1], 3), dtype=np.uint8)
+
+
+class DeblurProcessor:
+    """
+    Runs the live deblur model (whatever backend the manager currently
+    serves) through the SharedModelRunner under its own scheduler slot, so
+    API requests share the model fairly with the camera streams. Images of
+    the same size go through one forward.
+    """
+
+    def __init__(self, runner, slot="api", weight=1):
+        self.runner = runner
+        self.slot = slot
+        runner.register(slot, weight)
+
+    @property
+    def loaded(self):
+        return self.runner.backend is not None
+
+    def __call__(self, images):
+        backend = self.runner.backend
+        outputs = [None] * len(images)
+        by_shape = {}
+        for i, image in enumerate(images):
+            by_shape.setdefault(image.shape, []).append(i)
+        for shape, indices in by_shape.items():
+            frames = [cv2.cvtColor(images[i], cv2.COLOR_BGR2RGB) for i in indices]
+            inputs = backend.prepare(frames)
+            result, _ = self.runner.infer(self.slot, inputs, backend)
+            for i, enhanced in zip(indices, backend.finish(result, shape[:2])):
+                outputs[i] = cv2.cvtColor(enhanced, cv2.COLOR_RGB2BGR)
+        return outputs
+
+
+class _LazyModel:
+    """Loads the model on first use (by whichever thread needs it first), not at import."""
+
+    def __init__(self):
+        self.model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def get(self):
+        with self._lock:
+            if self.model is None:
+                self.model = self.load()
+            return self.model
+
+    def load(self):
+        raise NotImplementedError
+
+
+class DetectProcessor(_LazyModel):
+    """
+    YOLOv8 (PartsDetector) over a batch of images; also used by the streams
+    (FrameDetector). Ultralytics models are not thread-safe, so inference
+    from the batcher and the stream detect stages is serialized.
+    """
+
+    def __init__(self, model_size="n", conf_threshold=0.25):
+        super().__init__()
+        self.model_size = model_size
+        self.conf_threshold = conf_threshold
+        self._infer_lock = threading.Lock()
+
+    def load(self):
+        # parts_detector.py lives at the repo root
+        from parts_detector import PartsDetector
+        return PartsDetector(model_size=self.model_size)
+
+    def detect(self, image):
+        """Detections for one BGR image, without drawing an annotated copy."""
+        model = self.get()
+        with self._infer_lock:
+            detections, _ = model.detect(image, self.conf_threshold, annotate=False)
+        return detections
+
+    def __call__(self, images):
+        model = self.get()
+        with self._infer_lock:
+            return model.detect_batch(images, self.conf_threshold)
+
+
+class OCRProcessor(_LazyModel):
+    """
+    Wagon detection + EasyOCR (WagonOCR) over a batch of images. The streams
+    (FrameDetector) reuse it through read_wagons(); calls are serialized as
+    in DetectProcessor.
+    """
+
+    def __init__(self, use_gpu=False):
+        super().__init__()
+        self.use_gpu = use_gpu
+        self._infer_lock = threading.Lock()
+
+    def load(self):
+        from wagon_ocr import WagonOCR
+        return WagonOCR(use_gpu=self.use_gpu)
+
+    def read_wagons(self, image, detections):
+        """Wagon numbers {"text", "confidence", "bbox"} of the wagons in `detections` (BGR)."""
+        model = self.get()
+        with self._infer_lock:
+            wagons = model.read_wagons(image, detections)
+        return [{"text": w["ocr_text"], "confidence": w["ocr_conf"], "bbox": w["bbox"]}
+                for w in wagons]
+
+    def __call__(self, images):
+        model = self.get()
+        with self._infer_lock:
+            return model.process_frames(images)
@@ -0,0 +1,98 @@
+"""
+Wire formats for frames pushed over the /ws WebSocket.
+
+JSON (default): {"original": <b64 jpeg>, "enhanced": <b64 jpeg>, "filename", "inference_time",
+                 "frame_id", "mime_type", "blur_score", "deblurred", "detections"}
+
+Binary (opt-in with ?protocol=binary): one message per frame,
+
+    header     little-endian struct "<BIfBHIII"
+               version (u8), frame_id (u32), inference_ms (f32), mime_len (u8),
+               filename_len (u16), original_len (u32), enhanced_len (u32),
+               detections_len (u32)
+    mime_type  ascii, mime_len bytes ("image/jpeg" or "image/webp")
+    filename   utf-8, filename_len bytes
+    original   encoded image, original_len bytes
+    enhanced   encoded image, enhanced_len bytes
+    detections utf-8 JSON array, detections_len bytes (as in the JSON view)
+
+Version 1 had no mime_type or detections; both images were assumed JPEG.
+"""
+import base64
+import json
+import struct
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+
+BINARY_VERSION = 2
+HEADER = struct.Struct("<BIfBHIII")
+
+
+def to_json_payload(frame):
+    """Builds the legacy JSON message (base64 JPEGs) for a frame."""
+    return {
+        "original": base64.b64encode(frame["original_jpeg"]).decode("utf-8"),
+        "enhanced": base64.b64encode(frame["enhanced_jpeg"]).decode("utf-8"),
+        "filename": frame["filename"],
+        "inference_time": f"{frame['inference_ms']:.2f}ms",
+        "frame_id": frame["frame_id"],
+        "mime_type": frame.get("mime_type", "image/jpeg"),
+        "blur_score": frame.get("blur_score"),
+        "deblurred": frame.get("deblurred", True),
+        "detections": frame.get("detections", []),
+    }
+
+
+def replay_payload(record):
+    """JSON message for an event-log record replayed over /ws/replay."""
+    payload = {key: value for key, value in record.items() if key != "thumbnail"}
+    payload["inference_time"] = f"{record['inference_ms']:.2f}ms"
+    payload["replay"] = True
+    if record.get("thumbnail"):
+        payload["enhanced"] = base64.b64encode(record["thumbnail"]).decode("utf-8")
+    return payload
+
+
+def pack_frame(frame):
+    """Packs a frame into a single binary WebSocket message."""
+    mime_type = frame.get("mime_type", "image/jpeg").encode("ascii")[:0xFF]
+    filename = frame["filename"].encode("utf-8")[:0xFFFF]
+    detections = json.dumps(frame.get("detections", []), separators=(",", ":")).encode("utf-8")
+    header = HEADER.pack(
+        BINARY_VERSION,
+        frame["frame_id"] & 0xFFFFFFFF,
+        frame["inference_ms"],
+        len(mime_type),
+        len(filename),
+        len(frame["original_jpeg"]),
+        len(frame["enhanced_jpeg"]),
+        len(detections),
+    )
+    return b"".join((header, mime_type, filename, frame["original_jpeg"],
+                     frame["enhanced_jpeg"], detections))
+
+
+def unpack_frame(data):
+    """Inverse of pack_frame. Useful for Python clients and debugging."""
+    if data[0] != BINARY_VERSION:
+        raise ValueError(f"Unsupported frame protocol version: {data[0]}")
+    (_, frame_id, inference_ms, mime_len, name_len,
+     orig_len, enh_len, det_len) = HEADER.unpack_from(data, 0)
+
+    offset = HEADER.size
+    fields = []
+    for length in (mime_len, name_len, orig_len, enh_len, det_len):
+        fields.append(bytes(data[offset:offset + length]))
+        offset += length
+    mime_type, filename, original, enhanced, detections = fields
+
+    return {
+        "frame_id": frame_id,
+        "filename": filename.decode("utf-8"),
+        "inference_ms": inference_ms,
+        "mime_type": mime_type.decode("ascii"),
+        "original_jpeg": original,
+        "enhanced_jpeg": enhanced,
+        "detections": json.loads(detections),
+    }
@@ -0,0 +1,33 @@
+import time
+
+
+class Readiness:
+    """
+    State of the models initialized in the background at start-up, as
+    reported by /ready: pending -> loading -> ready (or failed).
+    """
+
+    def __init__(self, names):
+        self.models = {name: {"state": "pending", "error": None, "load_ms": None} for name in names}
+
+    def run(self, name, fn):
+        """Runs fn() as the initialization of `name`. Returns False if it failed."""
+        entry = self.models.setdefault(name, {"state": "pending", "error": None, "load_ms": None})
+        entry["state"] = "loading"
+        start = time.time()
+        try:
+            fn()
+            entry["state"] = "ready"
+        except Exception as e:
+            print(f"Initializing {name} failed: {e}")
+            entry.update(state="failed", error=str(e))
+        entry["load_ms"] = round((time.time() - start) * 1000)
+        return entry["state"] == "ready"
+
+    @property
+    def ready(self):
+        return all(entry["state"] == "ready" for entry in self.models.values())
+
+    def to_dict(self):
+        models = {name: dict(entry) for name, entry in self.models.items()}
+        return {"ready": self.ready, "models": models}
@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class CachedResult:
+    """Marker returned by the frame loader instead of pixels on a cache hit."""
+
+    def __init__(self, result):
+        self.result = result
+
+
+class ResultCache:
+    """
+    LRU of encoded original/enhanced payloads for image files, keyed by
+    (path, mtime, size) so an overwritten file is never served stale.
+    Bounded by the total size of the stored bytes.
+    """
+
+    def __init__(self, memory_budget=512 * 1024 * 1024):
+        self.memory_budget = memory_budget
+        self.entries = OrderedDict()  # key -> (result, size)
+        self.memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"result_cache_hits": 0, "result_cache_misses": 0}
+
+    @staticmethod
+    def key_for(path):
+        try:
+            st = os.stat(path)
+        except (OSError, TypeError, ValueError):
+            return None  # Live frames have no backing file
+        return (path, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _size(result):
+        size = len(result["original_jpeg"]) + len(result["enhanced_jpeg"])
+        if result.get("full"):
+            size += sum(len(data) for data in result["full"][1:])
+        return size
+
+    def get(self, path):
+        key = self.key_for(path)
+        with self._lock:
+            entry = self.entries.get(key) if key is not None else None
+            if entry is None:
+                self.stats["result_cache_misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["result_cache_hits"] += 1
+            return entry[0]
+
+    def contains(self, path):
+        key = self.key_for(path)
+        with self._lock:
+            return key is not None and key in self.entries
+
+    def put(self, path, result):
+        key = self.key_for(path)
+        if key is None:
+            return
+        size = self._size(result)
+        if size > self.memory_budget:
+            return
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.memory_bytes -= old[1]
+            self.entries[key] = (result, size)
+            self.memory_bytes += size
+            while self.memory_bytes > self.memory_budget:
+                _, (_, old_size) = self.entries.popitem(last=False)
+                self.memory_bytes -= old_size
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.memory_bytes = 0
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "result_cache_entries": len(self.entries),
+            "result_cache_mb": round(self.memory_bytes / (1024 * 1024), 1),
+        }
@@ -0,0 +1,292 @@
+import os
+import time
+import threading
+from collections import deque
+import cv2
+
+
+def parse_source(uri):
+    """Device indices may be passed as strings ("0"); everything else is a path or URL."""
+    if isinstance(uri, str) and uri.isdigit():
+        return int(uri)
+    return uri
+
+
+def source_name(uri):
+    if isinstance(uri, int):
+        return f"camera{uri}"
+    return os.path.basename(str(uri).rstrip("/")) or str(uri)
+
+
+class TailingCapture:
+    """
+    cv2.VideoCapture over a file that is still being written (an upload in
+    progress). When the decoder reaches the current end of the file before
+    `is_complete()` is true, it waits for more bytes, reopens the file and
+    seeks back to the next frame. Containers that keep their index at the
+    end (plain MP4 with a trailing moov atom) only decode once complete;
+    MKV, MPEG-TS and fragmented MP4 decode as they arrive.
+
+    Waiting is bounded: check_cancelled() is called on every poll and may
+    raise to abort (Job.update raises JobCancelled), and TimeoutError is
+    raised once the file has not grown for `idle_timeout` seconds.
+
+    Implements the subset of the VideoCapture API used in this package.
+    """
+
+    def __init__(self, path, is_complete, poll_interval=0.5, check_cancelled=None,
+                 idle_timeout=None):
+        self.path = path
+        self.is_complete = is_complete
+        self.poll_interval = poll_interval
+        self.check_cancelled = check_cancelled
+        self.idle_timeout = idle_timeout
+        self.frame_idx = 0
+        self.closed = False
+        self._size = -1
+        self._grew_at = time.time()
+        self.cap = cv2.VideoCapture(path)  # May not open until more bytes arrive
+
+    def isOpened(self):
+        # A file that is still arriving may become decodable; read() retries
+        return self.cap.isOpened() or not self.is_complete()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.frame_idx = int(value)
+        return self.cap.set(prop, value)
+
+    def _reopen(self):
+        self.cap.release()
+        self.cap = cv2.VideoCapture(self.path)
+        if self.frame_idx:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_idx)
+
+    def read(self):
+        retried_complete = False
+        while not self.closed:
+            ret, frame = self.cap.read()
+            if ret:
+                self.frame_idx += 1
+                return ret, frame
+            if self.is_complete():
+                # The bytes we just failed on may have arrived meanwhile
+                if retried_complete:
+                    return False, None
+                retried_complete = True
+            else:
+                self._wait()
+            self._reopen()
+        return False, None
+
+    def _wait(self):
+        if self.check_cancelled is not None:
+            self.check_cancelled()
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = -1
+        now = time.time()
+        if size != self._size:
+            self._size, self._grew_at = size, now
+        elif self.idle_timeout is not None and now - self._grew_at > self.idle_timeout:
+            raise TimeoutError(f"No new data in {self.path} for {self.idle_timeout:.0f}s")
+        time.sleep(self.poll_interval)
+
+    def release(self):
+        self.closed = True
+        self.cap.release()
+
+
+def open_capture(path, is_complete=None, check_cancelled=None, idle_timeout=None):
+    """VideoCapture for a finished file, TailingCapture for one still being written."""
+    if is_complete is None:
+        return cv2.VideoCapture(path)
+    return TailingCapture(path, is_complete, check_cancelled=check_cancelled,
+                          idle_timeout=idle_timeout)
+
+
+class QueuedSource:
+    """
+    Bounded queue of decoded (key, RGB frame) pairs shared by the live
+    sources below. Provides the get/skip/reset/stats interface the
+    streamer expects (the same one PrefetchDecoder has).
+    """
+
+    live = True
+
+    def __init__(self, name, queue_size=8):
+        self.name = name
+        self.frames = deque(maxlen=queue_size)
+        self._cond = threading.Condition()
+        self.stats = {"source": name, "source_fps": 0, "source_queue_depth": 0,
+                      "source_dropped_frames": 0, "input_wait_ms": 0}
+
+    def get(self, timeout=0.5):
+        """Returns the oldest queued (key, frame), or None if none arrives within `timeout`."""
+        wait_start = time.time()
+        with self._cond:
+            if not self.frames:
+                self._cond.wait(timeout)
+            wait_ms = (time.time() - wait_start) * 1000
+            self.stats["input_wait_ms"] = (self.stats["input_wait_ms"] * 0.9) + (wait_ms * 0.1)
+            if not self.frames:
+                return None
+            item = self.frames.popleft()
+            self.stats["source_queue_depth"] = len(self.frames)
+            self._cond.notify()
+            return item
+
+    def skip(self, count):
+        with self._cond:
+            skipped = 0
+            while skipped < count and self.frames:
+                self.frames.popleft()
+                skipped += 1
+            self.stats["source_queue_depth"] = len(self.frames)
+            self._cond.notify()
+            return skipped
+
+    def reset(self):
+        with self._cond:
+            self.frames.clear()
+            self.stats["source_queue_depth"] = 0
+
+
+class VideoCaptureSource(QueuedSource):
+    """
+    Live frame source backed by cv2.VideoCapture (video file, device index or
+    network URL such as rtsp://).
+
+    A reader thread decodes frames into a bounded queue. When the consumer
+    falls behind, the oldest frame is dropped so the stream stays live.
+    Local files are played back at their native FPS (`realtime=True`) and
+    looped, so a recording can stand in for a camera. With realtime=False a
+    file is read as fast as it is consumed, without dropping frames.
+
+    A file that is still being uploaded can be streamed by passing
+    `is_complete`; the reader then tails it (see TailingCapture) and stops
+    if it has not grown for `idle_timeout` seconds.
+    """
+
+    def __init__(self, uri, queue_size=8, realtime=True, loop=True, latency=None, is_complete=None,
+                 idle_timeout=None):
+        self.uri = parse_source(uri)
+        super().__init__(source_name(self.uri), queue_size)
+        self.is_file = isinstance(self.uri, str) and os.path.isfile(self.uri)
+        self.realtime = realtime and self.is_file
+        self.loop = loop and self.is_file
+        self.latency = latency  # Optional StageLatency receiving "decode" samples
+
+        if self.is_file:
+            self.cap = open_capture(self.uri, is_complete, idle_timeout=idle_timeout)
+        else:
+            self.cap = cv2.VideoCapture(self.uri)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video source {uri}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 25.0
+        self.stats["source_fps"] = round(self.fps, 2)
+
+        self.running = True
+        self.frame_idx = 0
+
+        self._thread = threading.Thread(target=self._reader_loop, name=f"capture-{self.name}",
+                                        daemon=True)
+        self._thread.start()
+
+    def _reopen(self):
+        self.cap.release()
+        time.sleep(1)
+        self.cap = cv2.VideoCapture(self.uri)
+
+    def _reader_loop(self):
+        interval = 1.0 / self.fps
+        next_due = time.time()
+        while self.running:
+            read_start = time.time()
+            try:
+                ret, frame = self.cap.read()
+            except TimeoutError as e:
+                print(f"Stopped streaming {self.uri}: {e}")
+                break
+            if not ret:
+                if self.loop:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if self.is_file:
+                    break  # End of a non-looping file
+                print(f"Lost video source {self.uri}, reconnecting...")
+                self._reopen()
+                continue
+
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if self.latency is not None:
+                self.latency.record("decode", time.time() - read_start)
+            key = f"{self.name}#{self.frame_idx:06d}"
+            self.frame_idx += 1
+
+            with self._cond:
+                # Files read faster than real time apply backpressure instead
+                # of dropping; cameras and real-time playback drop the oldest.
+                while self.is_file and not self.realtime and self.running \
+                        and len(self.frames) == self.frames.maxlen:
+                    self._cond.wait(0.5)
+                if len(self.frames) == self.frames.maxlen:
+                    self.stats["source_dropped_frames"] += 1
+                self.frames.append((key, frame))
+                self.stats["source_queue_depth"] = len(self.frames)
+                self._cond.notify()
+
+            if self.realtime:
+                next_due += interval
+                delay = next_due - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_due = time.time()  # Decoding slower than real time
+
+        self.cap.release()
+
+    def shutdown(self):
+        self.running = False
+        if isinstance(self.cap, TailingCapture):
+            self.cap.closed = True  # Stop waiting for bytes that may never come
+        self._thread.join(timeout=2)
+
+
+class PushSource(QueuedSource):
+    """
+    Live source fed by another component (see fanout.StreamFeed) instead of
+    its own decoder. push() never blocks: the oldest frame is dropped when
+    the stream falls behind. `on_finish` runs once the feeder is done.
+    """
+
+    def __init__(self, name, queue_size=8, on_finish=None):
+        super().__init__(name, queue_size)
+        self.on_finish = on_finish
+        self.running = True
+        self.frame_idx = 0
+
+    def push(self, frame_bgr):
+        if not self.running:
+            return
+        frame = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        key = f"{self.name}#{self.frame_idx:06d}"
+        self.frame_idx += 1
+        with self._cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.stats["source_dropped_frames"] += 1
+            self.frames.append((key, frame))
+            self.stats["source_queue_depth"] = len(self.frames)
+            self._cond.notify()
+
+    def finish(self):
+        if self.running and self.on_finish is not None:
+            self.on_finish(self)
+
+    def shutdown(self):
+        self.running = False
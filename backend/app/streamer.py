@@ -3,37 +3,176 @@ import cv2
 import torch
 import numpy as np
 from PIL import Image
-from ml.model import DeblurUNet
 import os
 import time
-import base64
-from io import BytesIO
+import threading
+from app.encoders import get_encoder
+from app.protocol import to_json_payload
+from app.broadcast import FrameHub
+from app.prefetch import PrefetchDecoder
+from app.sources import VideoCaptureSource
+from app.timing import FramePacer, StageLatency
+from app.result_cache import CachedResult
+from app.backends import create_backend
+from app.events import frame_event, timings_event
+from app.pipeline import StageWorker
 
 class VideoStreamer:
-    def __init__(self, dataset_path, model_path=None, device="cpu"):
+    def __init__(self, dataset_path, model_path=None, device="cpu", frame_queue_size=4,
+                 max_batch_size=1, max_batch_wait=0.01, prefetch_depth=4,
+                 target_fps=30, drop_late_frames=True, encoder=None,
+                 full_res_encoder=None, frame_cache=None, runner=None, stream_id="default",
+                 blur_gate=None, result_cache=None, warm_cache_on_reload=False,
+                 model_backend="unet", backend=None, tile_cache=None, event_log=None,
+                 event_bus=None, detector=None, detect_threads=None, intra_op_threads=None):
         self.device = device
-        self.model = DeblurUNet().to(device)
+        self.stream_id = stream_id
+
+        # The backend (see app/backends.py) owns the network, checkpoint
+        # format and pre/post-processing. With a runner (see StreamManager)
+        # forwards go through a backend shared by every stream instead of a
+        # private copy, and the runner may swap it on a model reload.
+        self.runner = runner
+        self._backend = None
+        if runner is None:
+            self._backend = backend or create_backend(model_backend, model_path, device)
+        self.frame_shape = None  # (h, w) of the last frame rendered, for warm-ups
+
+        # The dataset directory is listed when the stream starts, on the
+        # worker thread, so a large folder does not slow down start-up
         self.dataset_path = dataset_path
-        self.blur_path = os.path.join(dataset_path, "blurred_sharp", "blurred")
+        self.image_files = []
+        self._dataset_pending = bool(dataset_path)
+        if dataset_path:
+            self.blur_path = os.path.join(dataset_path, "blurred_sharp", "blurred")
+        self.current_idx = 0
+        self.running = False
+        self.latest_frame = None       # Raw JPEG bytes + metadata (binary protocol)
+        self.latest_frame_data = None  # Base64 JSON view of latest_frame
+        self.frame_id = 0
+        self.hub = FrameHub()          # Fans finished frames out to /ws clients
+        self.stats = {"fps": 0, "processing_fps": 0, "processed_count": 0,
+                      "avg_inference_time": 0, "batch_size": 1, "dropped_frames": 0,
+                      "skipped_sharp": 0, "errors": 0}
 
-        # Load model if exists, else utilize random init (demo mode)
-        if model_path and os.path.exists(model_path):
-            self.model.load_state_dict(torch.load(model_path, map_location=device))
-            print("Model loaded successfully.")
-        else:
-            print("Warning: No model found. Using random weights.")
-        
-        self.model.eval()
-        
-        self.image_files = [
+        # Optional BlurDetector: frames it scores as sharp bypass the model
+        self.blur_gate = blur_gate
+
+        # Optional TemporalTileCache: for nearly static cameras, only tiles
+        # that changed since the previous frame go through the model
+        self.tile_cache = tile_cache
+        if tile_cache is not None:
+            self.stats["tile_reuse_rate"] = 0.0
+
+        # Optional ResultCache: replayed image files skip decode, inference
+        # and encode. Can be warmed in the background after reload_images().
+        self.result_cache = result_cache
+        self.warm_cache_on_reload = warm_cache_on_reload
+        self._warm_generation = 0
+        self.stats["warmup_progress"] = None
+
+        # Optional EventLog: every published frame is appended (by its own
+        # writer thread) so incidents can be replayed later
+        self.event_log = event_log
+
+        # Optional EventBus: compact per-frame JSON events (and a timing
+        # summary every second) for /ws/events subscribers
+        self.event_bus = event_bus
+
+        # Optional detector (e.g. pipeline.FrameDetector) run on deblurred
+        # frames in its own stage thread: frame N is detected while frame
+        # N+1 is being deblurred, and the fields it returns ("detections",
+        # "wagon_numbers") are added to frame N's dict before it is
+        # published. intra_op_threads/detect_threads split the cores between
+        # the two stages.
+        self.detector = detector
+        self.intra_op_threads = intra_op_threads
+        self.detect_stage = None
+        if detector is not None:
+            self.detect_stage = StageWorker("detect", self._detect, self._detected,
+                                            num_threads=detect_threads,
+                                            queue_size=max(1, max_batch_size) + 1)
+
+        # Pace output to target_fps and skip frames when inference falls
+        # behind real time. Per-stage latency percentiles are served by /stats.
+        self.pacer = FramePacer(target_fps, drop_late_frames)
+        self.latency = StageLatency()
+
+        # JPEG/WebP encoder for streamed frames (fastest available backend by default)
+        self.encoder = encoder or get_encoder()
+        self.stats["encoder"] = f"{self.encoder.name}/{self.encoder.format.lower()}"
+
+        # Optional full-resolution copies, kept in frame_cache and served on
+        # demand while the socket only carries `encoder`'s (downscaled) preview.
+        self.frame_cache = frame_cache
+        self.full_res_encoder = (full_res_encoder
+                                 or get_encoder(self.encoder.format, self.encoder.quality))
+
+        # Micro-batching: up to max_batch_size frames share one forward pass.
+        # max_batch_wait bounds how long a partial batch waits for more input.
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_wait = max_batch_wait
+
+        # Decode -> infer -> encode runs on a worker thread so the event loop
+        # only has to publish finished frames. The worker hands them over with
+        # call_soon_threadsafe; _free_slots bounds how far it can run ahead.
+        self.frame_queue = asyncio.Queue()
+        self._free_slots = threading.Semaphore(frame_queue_size)
+        self._loop = None
+        self._lock = threading.Lock()
+        self._worker = None
+
+        # Decode the next frames in the background while the model is busy.
+        # Keep at least one full batch in flight.
+        self.prefetcher = PrefetchDecoder(self._next_path, self._load,
+                                          depth=max(prefetch_depth, self.max_batch_size))
+
+        # Where frames come from: the image-folder prefetcher, or a live
+        # VideoCaptureSource (file, device or URL) set with open_video().
+        self.source = self.prefetcher
+
+    def set_source(self, source):
+        """Switches the frame source, discarding frames from the previous one."""
+        old_source, self.source = self.source, source
+        if old_source is not source:
+            if old_source is self.prefetcher:
+                old_source.reset()
+            else:
+                old_source.shutdown()
+        self.pacer.reset()
+        if self.tile_cache is not None:
+            self.tile_cache.reset()
+        self._drain_queue()
+
+    def open_video(self, uri, realtime=True, loop=True, is_complete=None, idle_timeout=None):
+        """
+        Streams directly from a video file, device index or network URL
+        without extracting frames to disk. Returns False if it cannot be opened.
+        is_complete: for a file still being uploaded (the reader tails it,
+        giving up after idle_timeout seconds without new data).
+        """
+        try:
+            source = VideoCaptureSource(uri, realtime=realtime, loop=loop, latency=self.latency,
+                                        is_complete=is_complete, idle_timeout=idle_timeout)
+        except ValueError as e:
+            print(e)
+            return False
+        self.set_source(source)
+        print(f"Streaming from video source {uri} at {source.fps:.1f} FPS")
+        return True
+
+    def load_dataset(self):
+        """Lists the dataset's blurred frames, unless another image folder was loaded first."""
+        files = [
             os.path.join(self.blur_path, f) 
             for f in sorted(os.listdir(self.blur_path)) 
             if f.endswith(('.png', '.jpg'))
         ]
-        self.current_idx = 0
-        self.running = False
-        self.latest_frame_data = None
-        self.stats = {"fps": 0, "processed_count": 0, "avg_inference_time": 0}
+        with self._lock:
+            if self._dataset_pending:
+                self.image_files = files
+                self.current_idx = 0
+                self._dataset_pending = False
     
     def reload_images(self, new_dir):
         """Reloads images from a new directory."""
@@ -51,65 +190,450 @@ class VideoStreamer:
             print(f"No images found in {new_dir}")
             return False
             
-        self.running = False  # Pause stream briefly
-        self.image_files = new_files
-        self.current_idx = 0
-        self.running = True   # Resume
+        with self._lock:
+            self.image_files = new_files
+            self.current_idx = 0
+            self._dataset_pending = False
+        self.prefetcher.reset()
+        self.set_source(self.prefetcher)  # Also drops frames rendered from the old source
         print(f"Reloaded streamer with {len(new_files)} images from {new_dir}")
+        if self.result_cache is not None and self.warm_cache_on_reload:
+            self.warm_cache()
         return True
 
-    async def start_stream(self):
-        self.running = True
-        print("Stream started...")
-        while self.running:
-            start_time = time.time()
-            
-            # 1. Get Image
+    def _drain_queue(self):
+        if self.detect_stage is not None:
+            self.detect_stage.drain()
+        if self._loop is not None:
+            # Runs before any frame the worker hands over after this call
+            self._loop.call_soon_threadsafe(self._drain_frames)
+
+    def _drain_frames(self):
+        while not self.frame_queue.empty():
+            if self.frame_queue.get_nowait() is None:
+                self.frame_queue.put_nowait(None)  # Keep stop_stream()'s wake-up
+                return
+            self._free_slots.release()
+
+    def _next_path(self):
+        with self._lock:
             if not self.image_files:
-                await asyncio.sleep(1)
-                continue
-                
+                return None
             img_path = self.image_files[self.current_idx]
-            original_img = Image.open(img_path).convert("RGB")
-            
-            # 2. Preprocess
-            img_tensor = torch.from_numpy(np.array(original_img)).permute(2, 0, 1).float() / 255.0
-            img_tensor = img_tensor.unsqueeze(0).to(self.device)
-            
-            # 3. Inference
+            self.current_idx = (self.current_idx + 1) % len(self.image_files)
+            return img_path
+
+    def read_frame(self, img_path):
+        """Decodes an image file into an RGB uint8 array."""
+        return np.array(Image.open(img_path).convert("RGB"))
+
+    def _load(self, img_path):
+        """Prefetcher decode step: a cached result if the file was seen before, else pixels."""
+        if self.result_cache is not None:
+            cached = self.result_cache.get(img_path)
+            if cached is not None:
+                return CachedResult(cached)
+
+        start = time.time()
+        frame = self.read_frame(img_path)
+        self.latency.record("decode", time.time() - start)
+        return frame
+
+    @property
+    def backend(self):
+        return self.runner.backend if self.runner is not None else self._backend
+
+    def infer_batch(self, frames, slot=None):
+        """
+        Runs a single batched forward over a list of same-shape RGB arrays.
+        Returns the enhanced uint8 arrays (in input order) and the forward time.
+        `slot` is the scheduler slot to use with a shared runner.
+        """
+        # One backend for the whole batch, even if a reload swaps it meanwhile
+        backend = self.backend
+        batch = backend.prepare(frames)
+
+        if self.runner is not None:
+            enhanced, inf_time = self.runner.infer(slot or self.stream_id, batch, backend)
+        else:
             inf_start = time.time()
-            with torch.no_grad():
-                enhanced_tensor = self.model(img_tensor)
+            enhanced = backend.forward(batch)
             inf_time = time.time() - inf_start
-            
-            # 4. Postprocess
-            enhanced_img = enhanced_tensor.squeeze(0).permute(1, 2, 0).cpu().numpy()
-            enhanced_img = (enhanced_img * 255).astype(np.uint8)
-            original_numpy = np.array(original_img)
-
-            # 5. Encode images to base64 for frontend
-            def to_b64(img_arr):
-                img_pil = Image.fromarray(img_arr)
-                buff = BytesIO()
-                img_pil.save(buff, format="JPEG")
-                return base64.b64encode(buff.getvalue()).decode("utf-8")
-
-            self.latest_frame_data = {
-                "original": to_b64(original_numpy),
-                "enhanced": to_b64(enhanced_img),
-                "filename": os.path.basename(img_path),
-                "inference_time": f"{inf_time*1000:.2f}ms"
-            }
-            
-            # Update Stats
-            self.current_idx = (self.current_idx + 1) % len(self.image_files)
-            self.stats["processed_count"] += 1
-            self.stats["avg_inference_time"] = (self.stats["avg_inference_time"] * 0.9) + (inf_time * 0.1)
-            
-            loop_duration = time.time() - start_time
-            self.stats["fps"] = 1.0 / max(loop_duration, 0.001)
-            
-            await asyncio.sleep(0.03) # Simulate ~30 FPS cap if inference is too fast
+
+        self.frame_shape = frames[0].shape[:2]
+        return backend.finish(enhanced, frames[0].shape[:2]), inf_time
+
+    def infer_tiled(self, frame, slot=None):
+        """Deblurs one frame through the tile cache. Returns (enhanced, total forward time)."""
+        inf_time = 0.0
+
+        def run(crops):
+            nonlocal inf_time
+            outputs, t = self.infer_batch(crops, slot)
+            inf_time += t
+            return outputs
+
+        enhanced = self.tile_cache.process(frame, run)
+        self.stats["tile_reuse_rate"] = round(self.tile_cache.reuse_rate(), 3)
+        return enhanced, inf_time
+
+    def encode_result(self, original_numpy, enhanced_img, inf_time, blur_score=None,
+                      encoder=None, full_res_encoder=None):
+        """
+        Encodes an original/enhanced pair as raw image bytes plus metadata.
+        Full-resolution copies are included when a frame cache is configured.
+        The result does not depend on frame ids, so it can be cached.
+        """
+        encoder = encoder or self.encoder
+        full_res_encoder = full_res_encoder or self.full_res_encoder
+        deblurred = enhanced_img is not original_numpy
+
+        def encode_pair(enc):
+            # Frames passed through by the blur gate only need one encode
+            original = enc.encode(original_numpy)
+            return original, (enc.encode(enhanced_img) if deblurred else original)
+
+        full = None
+        if self.frame_cache is not None:
+            full = (full_res_encoder.mime_type,) + encode_pair(full_res_encoder)
+
+        original_bytes, enhanced_bytes = encode_pair(encoder)
+        return {
+            "inference_ms": inf_time * 1000,
+            "blur_score": blur_score,
+            "deblurred": deblurred,
+            "mime_type": encoder.mime_type,
+            "original_jpeg": original_bytes,
+            "enhanced_jpeg": enhanced_bytes,
+            "full": full,
+        }
+
+    def emit_frame(self, img_path, result):
+        """Assigns the next frame id and stores full-res copies for /frames."""
+        self.frame_id += 1
+        full = result.get("full")
+        if full is not None and self.frame_cache is not None:
+            mime_type, full_original, full_enhanced = full
+            self.frame_cache.put(self.stream_id, self.frame_id, {
+                "original": full_original,
+                "enhanced": full_enhanced,
+            }, mime_type)
+
+        frame = {key: value for key, value in result.items() if key != "full"}
+        frame["frame_id"] = self.frame_id
+        frame["filename"] = os.path.basename(img_path)
+        return frame
+
+    def _collect_batch(self):
+        """
+        Collects up to max_batch_size decoded frames, waiting at most
+        max_batch_wait seconds after the first one for the rest.
+        """
+        batch = []
+        deadline = None
+        while self.running and len(batch) < self.max_batch_size:
+            timeout = 0.5
+            if deadline is not None:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+
+            item = self.source.get(timeout)
+            if item is None:
+                break
+            batch.append(item)
+
+            if deadline is None:
+                deadline = time.time() + self.max_batch_wait
+        return batch
+
+    def render_batch(self, frames, slot=None, track_stats=True):
+        """
+        Deblurs a list of RGB arrays. Frames the blur gate scores as sharp are
+        passed through unchanged; the rest are grouped by shape so each shape
+        needs one forward pass. Returns [(enhanced, inf_time, blur_score)] in order.
+        Background work (cache warm-up) passes track_stats=False.
+        With a tile cache, live frames are rendered one by one in order
+        since each one is diffed against the previous.
+        """
+        enhanced = [None] * len(frames)
+        inf_times = [0.0] * len(frames)
+        blur_scores = [None] * len(frames)
+
+        # Warm-up renders whole frames out of order, so it skips the tile cache
+        tiled = self.tile_cache is not None and track_stats
+
+        groups = {}
+        for i, frame in enumerate(frames):
+            if self.blur_gate is not None:
+                # Frames are RGB here; BlurDetector would convert 3-channel input as BGR
+                is_blurry, score = self.blur_gate.detect(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY))
+                blur_scores[i] = float(score)
+                if not is_blurry:
+                    enhanced[i] = frame
+                    if track_stats:
+                        self.stats["skipped_sharp"] += 1
+                    continue
+            if tiled:
+                enhanced[i], inf_times[i] = self.infer_tiled(frame, slot)
+                self.latency.record("inference", inf_times[i])
+                continue
+            groups.setdefault(frame.shape, []).append(i)
+
+        for indices in groups.values():
+            outputs, inf_time = self.infer_batch([frames[i] for i in indices], slot)
+            for i, output in zip(indices, outputs):
+                enhanced[i] = output
+                inf_times[i] = inf_time / len(indices)
+            if track_stats:
+                self.latency.record("inference", inf_time)
+                self.stats["batch_size"] = (self.stats["batch_size"] * 0.9) + (len(indices) * 0.1)
+
+        return list(zip(enhanced, inf_times, blur_scores))
+
+    def process_batch(self, batch):
+        """
+        Turns a list of (path, frame) pairs into published frames, keeping
+        their order. Result-cache hits skip inference and encoding.
+        Returns [(frame, inf_time, enhanced, result)]; enhanced is None for
+        cache hits.
+        """
+        backend = self.backend  # Results rendered across a model swap are not cached
+        results = [None] * len(batch)
+        enhanced = [None] * len(batch)
+        fresh = [i for i, (_, frame) in enumerate(batch) if not isinstance(frame, CachedResult)]
+
+        rendered = self.render_batch([batch[i][1] for i in fresh]) if fresh else []
+        for i, (enhanced_img, inf_time, blur_score) in zip(fresh, rendered):
+            img_path, frame = batch[i]
+            enhanced[i] = enhanced_img
+            enc_start = time.time()
+            results[i] = self.encode_result(frame, enhanced_img, inf_time, blur_score)
+            self.latency.record("encode", time.time() - enc_start)
+            if self.result_cache is not None and self.backend is backend:
+                self.result_cache.put(img_path, results[i])
+
+        output = []
+        for i, (img_path, frame) in enumerate(batch):
+            result = results[i] if results[i] is not None else frame.result
+            emitted = self.emit_frame(img_path, result)
+            output.append((emitted, result["inference_ms"] / 1000, enhanced[i], result))
+        return output
+
+    def warm_cache(self):
+        """
+        Fills the result cache for every image in the current directory on a
+        background thread, as fast as the hardware allows. A later reload
+        cancels an unfinished warm-up.
+        """
+        self._warm_generation += 1
+        generation = self._warm_generation
+        with self._lock:
+            paths = list(self.image_files)
+        thread = threading.Thread(target=self._warm_loop, args=(paths, generation),
+                                  name=f"warmup-{self.stream_id}", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_loop(self, paths, generation):
+        # Own encoders (they hold buffers) and, when sharing a model, an own
+        # scheduler slot so the live stream keeps its fair share.
+        encoder, full_res_encoder = self.encoder.clone(), self.full_res_encoder.clone()
+        slot = f"{self.stream_id}/warmup"
+        if self.runner is not None:
+            self.runner.register(slot)
+
+        done = 0
+        try:
+            for start in range(0, len(paths), self.max_batch_size):
+                if generation != self._warm_generation:
+                    return  # Superseded by a newer reload
+                chunk = [p for p in paths[start:start + self.max_batch_size]
+                         if not self.result_cache.contains(p)]
+                frames = []
+                for img_path in chunk:
+                    try:
+                        frames.append((img_path, self.read_frame(img_path)))
+                    except Exception as e:
+                        print(f"Error reading frame {img_path}: {e}")
+
+                backend = self.backend  # As in process_batch: no results from a swapped-out model
+                rendered = []
+                if frames:
+                    rendered = self.render_batch([frame for _, frame in frames], slot,
+                                                 track_stats=False)
+                pairs = zip(frames, rendered)
+                for (img_path, frame), (enhanced_img, inf_time, blur_score) in pairs:
+                    result = self.encode_result(frame, enhanced_img, inf_time, blur_score,
+                                                encoder, full_res_encoder)
+                    if self.detector is not None:
+                        # Cache hits skip the detect stage, so the entry needs its detections
+                        try:
+                            result.update(self.detector(enhanced_img))
+                        except Exception as e:
+                            print(f"Error detecting on {img_path} during warm-up: {e}")
+                    if self.backend is not backend:
+                        break
+                    self.result_cache.put(img_path, result)
+
+                done = min(start + self.max_batch_size, len(paths))
+                self.stats["warmup_progress"] = f"{done}/{len(paths)}"
+            print(f"Result cache warmed with {len(paths)} frames for stream {self.stream_id}")
+        except Exception as e:
+            print(f"Error warming result cache: {e}")
+        finally:
+            if self.runner is not None:
+                self.runner.unregister(slot)
+
+    def _publish(self, frame):
+        # The JSON view is built here, off the event loop, once per frame.
+        item = (frame, to_json_payload(frame), time.time())
+
+        # Block while the queue is full so the worker never runs far ahead
+        # of what the event loop publishes.
+        while self.running:
+            if self._free_slots.acquire(timeout=0.5):
+                self._loop.call_soon_threadsafe(self.frame_queue.put_nowait, item)
+                return
+
+    def _deliver(self, frame):
+        """Hands a finished frame to the event loop and the event log."""
+        self._publish(frame)
+        if self.event_log is not None:
+            self.event_log.append(frame)
+
+    def _detect(self, item):
+        frame, enhanced, result = item
+        if enhanced is None:
+            # Cache hit: the live path and the warm-up both store detections in the result
+            return None
+        return self.detector(enhanced)
+
+    def _detected(self, item, fields):
+        # Stage results come back in order; attach them to their frame by id
+        frame, _, result = item
+        if fields is not None:
+            frame.update(fields)
+            result.update(fields)  # Replayed files reuse them from the result cache
+        self._deliver(frame)
+
+    def _worker_loop(self):
+        if self.intra_op_threads and self.runner is None:
+            torch.set_num_threads(self.intra_op_threads)
+        if self._dataset_pending:
+            try:
+                self.load_dataset()
+            except OSError as e:
+                print(f"Could not list dataset {self.blur_path}: {e}")
+        last_batch_end = time.time()
+        while self.running:
+            start_time = time.time()
+
+            batch = self._collect_batch()
+            if not batch:
+                if not self.source.live:
+                    time.sleep(1)  # Live sources already waited inside get()
+                continue
+
+            try:
+                results = self.process_batch(batch)
+            except Exception as e:
+                print(f"Error processing batch starting at {batch[0][0]}: {e}")
+                self.stats["errors"] += 1
+                continue
+
+            processing_time = time.time() - start_time
+            self.stats["processing_fps"] = len(results) / max(processing_time, 0.001)
+
+            skip = 0
+            for frame, inf_time, enhanced, result in results:
+                if self.detect_stage is not None:
+                    self.detect_stage.submit((frame, enhanced, result))
+                else:
+                    self._deliver(frame)
+
+                # Update Stats
+                self.stats["processed_count"] += 1
+                self.stats["avg_inference_time"] = ((self.stats["avg_inference_time"] * 0.9)
+                                                    + (inf_time * 0.1))
+
+                # Sleep if ahead of target_fps, so batched frames go out
+                # evenly spaced; count frames to drop if behind real time.
+                # Live sources are paced by the camera and drop late frames
+                # in their own queue.
+                if not self.source.live:
+                    skip += self.pacer.advance(1)
+
+            if skip:
+                self.stats["dropped_frames"] += self.source.skip(skip)
+
+            now = time.time()
+            self.stats["fps"] = len(results) / max(now - last_batch_end, 0.001)
+            last_batch_end = now
+
+    async def start_stream(self):
+        self.running = True
+        self._loop = asyncio.get_running_loop()
+        print(f"Stream {self.stream_id} started...")
+        self._worker = threading.Thread(target=self._worker_loop, name="streamer-worker",
+                                        daemon=True)
+        self._worker.start()
+
+        last_timings = time.time()
+        while self.running:
+            item = await self.frame_queue.get()
+            if item is None:
+                break  # Woken up by stop_stream()
+            self._free_slots.release()
+            frame, json_view, ready_time = item
+            self.latest_frame, self.latest_frame_data = frame, json_view
+            self.hub.publish(frame, json_view)
+            self.latency.record("publish", time.time() - ready_time)
+            if self.event_bus is not None and self.event_bus.subscribers:
+                self.event_bus.publish(frame_event(self.stream_id, frame))
+
+            if (self.event_bus is not None and self.event_bus.subscribers
+                    and time.time() - last_timings >= 1.0):
+                last_timings = time.time()
+                self.event_bus.publish(timings_event(self.stream_id, self.stats,
+                                                     self.latency.summary()))
+
+    def get_stats(self):
+        """Stream, source, client and latency stats as served by /stats."""
+        stats = {**self.stats, **self.source.stats, **self.hub.stats()}
+        stats["skip_rate"] = self.stats["skipped_sharp"] / max(self.stats["processed_count"], 1)
+        if self.result_cache is not None:
+            stats.update(self.result_cache.get_stats())
+        if self.frame_cache is not None:
+            stats.update(self.frame_cache.stats())
+        if self.event_log is not None:
+            stats.update(self.event_log.get_stats())
+        if self.event_bus is not None:
+            stats.update(self.event_bus.stats())
+        if self.detect_stage is not None:
+            stats.update(self.detect_stage.stats)
+        stats["latency_ms"] = self.latency.summary()
+        return stats
 
     def stop_stream(self):
         self.running = False
+        self.set_source(self.prefetcher)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.frame_queue.put_nowait, None)
+
+    def on_model_swapped(self):
+        """Drops everything rendered by the previous model."""
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        if self.tile_cache is not None:
+            self.tile_cache.reset()
+
+    def close(self):
+        """Stops the stream and its background threads for good."""
+        self.stop_stream()
+        if self.detect_stage is not None:
+            self.detect_stage.shutdown()
+        if self.event_log is not None:
+            self.event_log.close()
+        if self.frame_cache is not None:
+            self.frame_cache.drop_stream(self.stream_id)
@@ -0,0 +1,75 @@
+import time
+from collections import deque
+import numpy as np
+from app.metrics import Histogram
+
+
+class StageLatency:
+    """
+    Keeps the most recent samples per pipeline stage and reports percentiles.
+    Every sample also goes into a cumulative Histogram per stage for /metrics.
+    """
+
+    STAGES = ("decode", "inference", "encode", "publish")
+
+    def __init__(self, window=1000):
+        self.samples = {stage: deque(maxlen=window) for stage in self.STAGES}
+        self.histograms = {stage: Histogram() for stage in self.STAGES}
+
+    def record(self, stage, seconds):
+        self.samples[stage].append(seconds)
+        self.histograms[stage].observe(seconds)
+
+    def summary(self):
+        """Returns {stage: {"p50": ms, "p95": ms, "p99": ms, "count": n}}."""
+        result = {}
+        for stage, values in self.samples.items():
+            values = list(values)
+            if not values:
+                result[stage] = {"p50": 0, "p95": 0, "p99": 0, "count": 0}
+                continue
+            p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+            result[stage] = {"p50": round(float(p50), 2), "p95": round(float(p95), 2),
+                             "p99": round(float(p99), 2), "count": len(values)}
+        return result
+
+
+class FramePacer:
+    """
+    Paces output to a target FPS the way a real camera would deliver frames.
+    When processing falls behind real time, reports how many frames should be
+    skipped to catch up instead of building an ever-growing delay.
+    """
+
+    def __init__(self, target_fps=30, drop_late_frames=True):
+        self.interval = 1.0 / target_fps if target_fps else 0
+        self.drop_late_frames = drop_late_frames
+        self.next_due = None
+
+    def reset(self):
+        self.next_due = None
+
+    def advance(self, frames=1):
+        """
+        Call after `frames` frames were produced. Sleeps if ahead of schedule,
+        otherwise returns the number of frames to drop to get back on schedule.
+        """
+        if not self.interval:
+            return 0
+
+        now = time.time()
+        if self.next_due is None:
+            self.next_due = now
+        self.next_due += frames * self.interval
+
+        lag = now - self.next_due
+        if lag < 0:
+            time.sleep(-lag)
+            return 0
+
+        skip = int(lag / self.interval)
+        if not self.drop_late_frames:
+            self.next_due = now  # Never try to "catch up" with a burst
+            return 0
+        self.next_due += skip * self.interval
+        return skip
@@ -0,0 +1,140 @@
+import os
+import time
+import uuid
+import threading
+
+
+class UploadSession:
+    """
+    A resumable upload spooled to disk. Chunks must be appended at the
+    current offset, so a client that lost its connection asks for
+    `received` and continues from there.
+    """
+
+    def __init__(self, upload_id, filename, path, size):
+        self.id = upload_id
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.received = 0
+        self.started = False  # Processing kicked off (see UploadManager.start_bytes)
+        self.aborted = False  # Expired before completion; readers stop tailing
+        self.job_id = None
+        self.last_activity = time.time()
+        self._lock = threading.Lock()
+        open(path, "wb").close()
+
+    @property
+    def complete(self):
+        return self.received >= self.size
+
+    def finished(self):
+        """For tailing readers: no more bytes will arrive."""
+        return self.complete or self.aborted
+
+    def write(self, offset, data):
+        """Appends `data` at `offset`. Returns the new received count."""
+        with self._lock:
+            if offset != self.received:
+                raise ValueError(f"Expected offset {self.received}, got {offset}")
+            if self.received + len(data) > self.size:
+                raise ValueError("Chunk extends past the declared upload size")
+            with open(self.path, "ab") as f:
+                f.write(data)
+                f.flush()
+            self.received += len(data)
+            self.last_activity = time.time()
+            return self.received
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "received": self.received,
+            "complete": self.complete,
+            "job_id": self.job_id,
+        }
+
+
+class UploadManager:
+    """
+    Tracks in-progress uploads and bounds their disk usage.
+
+    A new upload is refused if it is larger than `max_upload_bytes` or if
+    the declared sizes of all unfinished uploads would exceed
+    `spool_budget_bytes`. Uploads idle for `expire_seconds` are dropped,
+    checked every `sweep_interval` seconds on a background thread (and on
+    create()). Processing may start once `start_bytes` have arrived.
+    """
+
+    def __init__(self, spool_dir, max_upload_bytes, spool_budget_bytes, start_bytes=4 * 1024 * 1024,
+                 expire_seconds=3600, sweep_interval=None):
+        self.spool_dir = spool_dir
+        self.max_upload_bytes = max_upload_bytes
+        self.spool_budget_bytes = spool_budget_bytes
+        self.start_bytes = start_bytes
+        self.expire_seconds = expire_seconds
+        self.sessions = {}
+        self._lock = threading.Lock()
+        if sweep_interval:
+            thread = threading.Thread(target=self._sweep_loop, args=(sweep_interval,),
+                                      name="upload-expiry", daemon=True)
+            thread.start()
+
+    def _sweep_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                for session in self.expire():
+                    print(f"Expired idle upload {session.id} "
+                          f"({session.received}/{session.size} bytes)")
+            except Exception as e:
+                print(f"Error expiring uploads: {e}")
+
+    def create(self, filename, size):
+        if size <= 0:
+            raise ValueError("Upload size must be positive")
+        if size > self.max_upload_bytes:
+            limit_mb = self.max_upload_bytes // (1024 * 1024)
+            raise ValueError(f"Upload exceeds the {limit_mb} MB limit")
+        self.expire()
+        with self._lock:
+            pending = sum(s.size for s in self.sessions.values() if not s.complete)
+            if pending + size > self.spool_budget_bytes:
+                raise ValueError("Upload spool is full, try again later")
+            upload_id = uuid.uuid4().hex[:12]
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = os.path.join(self.spool_dir, f"{upload_id}_{os.path.basename(filename)}")
+            session = UploadSession(upload_id, os.path.basename(filename), path, size)
+            self.sessions[upload_id] = session
+            return session
+
+    def get(self, upload_id):
+        return self.sessions.get(upload_id)
+
+    def should_start(self, session):
+        """True once for each upload, when enough bytes arrived to start decoding."""
+        with self._lock:
+            if session.started or (session.received < self.start_bytes and not session.complete):
+                return False
+            session.started = True
+            return True
+
+    def expire(self):
+        """Forgets uploads idle for expire_seconds; unfinished ones lose their spool file."""
+        now = time.time()
+        expired = []
+        with self._lock:
+            for upload_id, session in list(self.sessions.items()):
+                if now - session.last_activity > self.expire_seconds:
+                    del self.sessions[upload_id]
+                    expired.append(session)
+        for session in expired:
+            if not session.complete:
+                session.aborted = True
+                try:
+                    os.remove(session.path)
+                except OSError:
+                    pass
+        return expired
@@ -0,0 +1,75 @@
+import threading
+import time
+import pytest
+from app.batcher import DynamicBatcher
+
+
+def test_concurrent_requests_share_a_batch():
+    sizes = []
+
+    def double(items):
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = DynamicBatcher("test", double, max_batch_size=4, max_delay=0.05)
+    futures = [batcher.submit(i) for i in range(4)]
+    assert [f.result(timeout=2) for f in futures] == [0, 2, 4, 6]
+    assert sizes == [4]
+
+
+def test_batch_runs_after_max_delay():
+    batcher = DynamicBatcher("test", lambda items: items, max_batch_size=8, max_delay=0.01)
+    start = time.time()
+    assert batcher.submit("a").result(timeout=2) == "a"
+    assert time.time() - start < 1
+
+
+def test_cancelled_request_is_dropped_and_batcher_keeps_running():
+    release = threading.Event()
+    seen = []
+
+    def slow(items):
+        release.wait(2)
+        seen.extend(items)
+        return items
+
+    batcher = DynamicBatcher("test", slow, max_batch_size=1, max_delay=0)
+    blocker = batcher.submit("first")
+    cancelled = batcher.submit("cancelled")
+    assert cancelled.cancel()
+    release.set()
+    assert blocker.result(timeout=2) == "first"
+    assert batcher.submit("after").result(timeout=2) == "after"
+    assert "cancelled" not in seen
+
+
+def test_failing_batch_fails_its_requests_only():
+    def fn(items):
+        if "bad" in items:
+            raise ValueError("boom")
+        return items
+
+    batcher = DynamicBatcher("test", fn, max_batch_size=1, max_delay=0)
+    with pytest.raises(ValueError):
+        batcher.submit("bad").result(timeout=2)
+    assert batcher.submit("good").result(timeout=2) == "good"
+    assert batcher.stats["errors"] == 1
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = DynamicBatcher("test", lambda items: [], max_batch_size=1, max_delay=0)
+    with pytest.raises(RuntimeError):
+        batcher.submit("x").result(timeout=2)
+    assert batcher._thread.is_alive()
+
+
+def test_submit_rejects_beyond_max_pending():
+    release = threading.Event()
+    batcher = DynamicBatcher("test", lambda items: (release.wait(2), items)[1],
+                             max_batch_size=1, max_delay=0, max_pending=1)
+    batcher.submit(1)
+    time.sleep(0.05)  # Let the worker take the first request
+    batcher.submit(2)
+    with pytest.raises(RuntimeError):
+        batcher.submit(3)
+    release.set()
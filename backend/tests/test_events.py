@@ -0,0 +1,24 @@
+from app.events import EventFilter, frame_event
+
+FRAME = {
+    "frame_id": 3, "filename": "f.png", "inference_ms": 5.0,
+    "detections": [{"label": "Train", "confidence": 0.9, "bbox": [0, 0, 1, 1]},
+                   {"label": "Car", "confidence": 0.3, "bbox": [0, 0, 1, 1]}],
+    "wagon_numbers": [{"text": "NWR12345", "confidence": 0.8, "bbox": [0, 0, 1, 1]}],
+}
+
+
+def test_wagon_number_label_matches_ocr_results():
+    event = frame_event("left", FRAME)
+    filtered = EventFilter(labels="wagon_number").apply(event)
+    assert filtered["detections"] == []
+    assert filtered["wagon_numbers"][0]["text"] == "NWR12345"
+
+
+def test_label_and_confidence_filters():
+    event = frame_event("left", FRAME)
+    filtered = EventFilter(labels="Train,Car", min_confidence=0.5).apply(event)
+    assert [d["label"] for d in filtered["detections"]] == ["Train"]
+    assert filtered["wagon_numbers"] == []
+    assert EventFilter(labels="Truck").apply(event) is None
+    assert EventFilter(stream_ids="right").apply(event) is None
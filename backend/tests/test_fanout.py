@@ -0,0 +1,90 @@
+import threading
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+from app.fanout import FrameConsumer, FrameFanout  # noqa: E402
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Recorder(FrameConsumer):
+    def __init__(self, name="recorder", blocking=True, fail_at=None, gate=None):
+        self.name = name
+        self.blocking = blocking
+        self.fail_at = fail_at
+        self.gate = gate
+        self.indices = []
+        self.closed = False
+
+    def consume(self, index, frame):
+        if self.gate is not None:
+            self.gate.wait(2)
+        if index == self.fail_at:
+            raise RuntimeError("consumer broke")
+        self.indices.append(index)
+
+    def close(self):
+        self.closed = True
+
+
+def write_video(path, frames=20):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), i * 10, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_every_consumer_gets_every_frame(tmp_path):
+    video = write_video(tmp_path / "clip.avi")
+    first, second = Recorder("first"), Recorder("second")
+    assert FrameFanout(video, [first, second], queue_size=2).run() == 20
+    assert first.indices == second.indices == list(range(20))
+    assert first.closed and second.closed
+
+
+def test_failing_consumer_is_detached(tmp_path):
+    video = write_video(tmp_path / "clip.avi")
+    broken, healthy = Recorder("broken", fail_at=3), Recorder("healthy")
+    fanout = FrameFanout(video, [broken, healthy])
+    assert fanout.run() == 20
+    assert fanout.errors == {"broken": "consumer broke"}
+    assert broken.indices == [0, 1, 2]
+    assert healthy.indices == list(range(20))
+
+
+def test_slow_non_blocking_consumer_drops_frames(tmp_path):
+    video = write_video(tmp_path / "clip.avi")
+    gate = threading.Event()
+    slow = Recorder("stream", blocking=False, gate=gate)
+    fanout = FrameFanout(video, [slow], queue_size=1,
+                         progress=lambda done, total: gate.set() if done == 20 else None)
+    assert fanout.run() == 20
+    assert fanout.dropped["stream"] > 0
+    assert len(slow.indices) + fanout.dropped["stream"] == 20
+
+
+def test_cancel_stops_decode_and_closes_consumers(tmp_path):
+    video = write_video(tmp_path / "clip.avi")
+    recorder = Recorder()
+
+    def progress(done, total):
+        if done == 5:
+            raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        FrameFanout(video, [recorder], progress=progress).run()
+    assert recorder.indices == list(range(5))
+    assert recorder.closed
+
+
+def test_stalled_upload_times_out_and_closes_consumers(tmp_path):
+    path = tmp_path / "upload.mp4"
+    path.write_bytes(b"\x00" * 1024)  # Never becomes decodable
+    recorder = Recorder()
+    fanout = FrameFanout(str(path), [recorder], is_complete=lambda: False, idle_timeout=0.2)
+    with pytest.raises((TimeoutError, ValueError)):
+        fanout.run()
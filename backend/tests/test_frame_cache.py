@@ -0,0 +1,37 @@
+from app.frame_cache import FrameCache
+
+FRAME = {"original": b"o" * 512, "enhanced": b"e" * 512}
+
+
+def test_streams_share_one_memory_budget(tmp_path):
+    cache = FrameCache(4 * 1024, str(tmp_path / "spill"), max_disk_frames=100)
+    for frame_id in range(1, 9):
+        for stream_id in ("left", "right"):
+            cache.put(stream_id, frame_id, FRAME, "image/jpeg")
+
+    # 16 frames of 1 KB against a 4 KB budget, whichever stream they came from
+    assert cache.memory_bytes <= 4 * 1024
+    assert len(cache.memory) == 4
+    assert cache.get("left", 8, "original") == (FRAME["original"], "image/jpeg")
+    assert cache.get("right", 1, "enhanced") == (FRAME["enhanced"], "image/jpeg")  # Spilled
+
+
+def test_same_frame_id_on_two_streams_does_not_collide(tmp_path):
+    cache = FrameCache(1024, str(tmp_path / "spill"))
+    cache.put("left", 1, {"original": b"left"}, "image/jpeg")
+    cache.put("right", 1, {"original": b"right"}, "image/jpeg")
+    assert cache.get("left", 1, "original") == (b"left", "image/jpeg")
+    assert cache.get("right", 1, "original") == (b"right", "image/jpeg")
+
+
+def test_drop_stream_forgets_only_that_stream(tmp_path):
+    cache = FrameCache(2 * 1024, str(tmp_path / "spill"))
+    for frame_id in range(1, 4):
+        cache.put("left", frame_id, FRAME, "image/jpeg")
+    cache.put("right", 1, FRAME, "image/jpeg")
+
+    cache.drop_stream("left")
+    assert all(cache.get("left", frame_id, "original") is None for frame_id in range(1, 4))
+    assert cache.get("right", 1, "original") is not None
+    assert cache.memory_bytes == 1024
+    assert list((tmp_path / "spill").iterdir()) == []
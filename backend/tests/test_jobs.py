@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+from app.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, Job, JobCancelled, JobQueue
+
+
+def blocking_job(started, release):
+    def run(job):
+        started.set()
+        release.wait(2)
+        return "ok"
+    return run
+
+
+def test_job_runs_and_cleans_up():
+    queue = JobQueue(max_workers=1)
+    cleaned = threading.Event()
+    job = queue.submit("test", lambda job, x: x * 2, 21, cleanup=cleaned.set)
+    assert job.future.result(timeout=2) is None
+    assert job.state == DONE and job.result == 42
+    assert job.finished_at is not None
+    assert cleaned.is_set()
+
+
+def test_failed_job_is_counted_and_cleans_up():
+    queue = JobQueue(max_workers=1)
+    cleaned = threading.Event()
+
+    def fail(job):
+        raise ValueError("boom")
+
+    job = queue.submit("test", fail, cleanup=cleaned.set)
+    job.future.result(timeout=2)
+    assert job.state == FAILED and job.error == "boom"
+    assert queue.failed_total.value == 1
+    assert cleaned.is_set()
+
+
+def test_cancel_queued_job_releases_its_slot_and_cleans_up():
+    queue = JobQueue(max_workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+    running = queue.submit("running", blocking_job(started, release))
+    assert started.wait(2)
+    cleaned = threading.Event()
+    queued = queue.submit("queued", lambda job: "never", cleanup=cleaned.set)
+    assert queue.full()
+    with pytest.raises(RuntimeError):
+        queue.submit("refused", lambda job: None)
+
+    assert queue.cancel(queued.id)
+    assert queued.state == CANCELLED and queued.finished_at is not None
+    assert cleaned.is_set()
+    assert not queue.full()
+    release.set()
+    running.future.result(timeout=2)
+    assert running.state == DONE
+
+
+def test_job_cancelled_after_pickup_is_marked_cancelled():
+    # The pool took the job (so future.cancel() fails) but _run has not started it
+    queue = JobQueue(max_workers=1)
+    cleaned = threading.Event()
+    ran = []
+    job = Job("test")
+    job.cleanup = cleaned.set
+    job._cancel.set()
+    queue._run(job, lambda job: ran.append(job), ())
+    assert not ran
+    assert job.state == CANCELLED and job.finished_at is not None
+    assert cleaned.is_set()
+
+
+def test_cancel_running_job_stops_it_at_next_update():
+    queue = JobQueue(max_workers=1)
+    started = threading.Event()
+    cleaned = threading.Event()
+
+    def loop(job):
+        started.set()
+        while True:
+            job.update(stage="work")
+            time.sleep(0.01)
+
+    job = queue.submit("test", loop, cleanup=cleaned.set)
+    assert started.wait(2)
+    assert job.state == RUNNING
+    assert queue.cancel(job.id)
+    job.future.result(timeout=2)
+    assert job.state == CANCELLED
+    assert cleaned.is_set()
+    assert not queue.cancel(job.id)
+
+
+def test_update_raises_once_cancelled():
+    queue = JobQueue(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    queue.submit("running", blocking_job(started, release))
+    assert started.wait(2)
+    job = queue.submit("queued", lambda job: None)
+    assert job.state == QUEUED
+    job._cancel.set()
+    with pytest.raises(JobCancelled):
+        job.update(1, 2)
+    release.set()
@@ -0,0 +1,85 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+from app.pipeline import FrameDetector  # noqa: E402
+from app.processing import DetectProcessor  # noqa: E402
+
+
+class FakeParts:
+    """Stands in for PartsDetector and records overlapping calls."""
+
+    def __init__(self):
+        self.active = 0
+        self.overlaps = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            if self.active > 1:
+                self.overlaps += 1
+        time.sleep(0.005)
+        with self._lock:
+            self.active -= 1
+
+    def detect(self, image, conf_threshold=0.25, annotate=True):
+        self._enter()
+        return [{"label": "Train", "confidence": 0.9, "bbox": [0, 0, 1, 1]}], None
+
+    def detect_batch(self, images, conf_threshold=0.25):
+        self._enter()
+        return [[] for _ in images]
+
+
+class FakeDetectProcessor(DetectProcessor):
+    def load(self):
+        return FakeParts()
+
+
+def test_streams_and_batcher_never_run_the_shared_model_at_once():
+    processor = FakeDetectProcessor()
+    stream_detector = FrameDetector(processor)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    def stream():
+        for _ in range(20):
+            assert stream_detector(frame)["detections"][0]["label"] == "Train"
+
+    def api():
+        for _ in range(20):
+            assert processor([frame, frame]) == [[], []]
+
+    threads = [threading.Thread(target=fn) for fn in (stream, stream, api)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    model = processor.get()
+    assert model.calls == 60
+    assert model.overlaps == 0
+
+
+class FakeOCR:
+    def __init__(self):
+        self.calls = 0
+
+    def read_wagons(self, image, detections):
+        self.calls += 1
+        return [{"text": "NWR12345", "confidence": 0.8, "bbox": detections[0]["bbox"]}]
+
+
+def test_frame_detector_reads_wagon_numbers_on_sampled_frames():
+    ocr = FakeOCR()
+    detector = FrameDetector(FakeDetectProcessor(), ocr, ocr_interval=5)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    results = [detector(frame) for _ in range(12)]
+    assert all(r["detections"][0]["label"] == "Train" for r in results)
+    sampled = [i for i, r in enumerate(results) if "wagon_numbers" in r]
+    assert sampled == [0, 5, 10]
+    assert results[0]["wagon_numbers"][0]["text"] == "NWR12345"
+    assert ocr.calls == 3
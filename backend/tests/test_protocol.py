@@ -0,0 +1,39 @@
+import pytest
+from app.protocol import BINARY_VERSION, HEADER, pack_frame, to_json_payload, unpack_frame
+
+
+def make_frame(**extra):
+    frame = {"frame_id": 7, "filename": "wagon_001.png", "inference_ms": 12.5,
+             "original_jpeg": b"\xff\xd8original", "enhanced_jpeg": b"\xff\xd8enhanced"}
+    frame.update(extra)
+    return frame
+
+
+def test_binary_round_trip_keeps_mime_type_and_detections():
+    detections = [{"label": "Train", "confidence": 0.9, "bbox": [1, 2, 3, 4]}]
+    frame = make_frame(mime_type="image/webp", detections=detections)
+    unpacked = unpack_frame(pack_frame(frame))
+    assert unpacked["frame_id"] == 7
+    assert unpacked["filename"] == "wagon_001.png"
+    assert unpacked["inference_ms"] == pytest.approx(12.5)
+    assert unpacked["mime_type"] == "image/webp"
+    assert unpacked["original_jpeg"] == frame["original_jpeg"]
+    assert unpacked["enhanced_jpeg"] == frame["enhanced_jpeg"]
+    assert unpacked["detections"] == detections
+
+
+def test_binary_defaults_match_json_view():
+    frame = make_frame()
+    unpacked = unpack_frame(pack_frame(frame))
+    payload = to_json_payload(frame)
+    assert unpacked["mime_type"] == payload["mime_type"] == "image/jpeg"
+    assert unpacked["detections"] == payload["detections"] == []
+
+
+def test_unpack_rejects_other_versions():
+    data = bytearray(pack_frame(make_frame()))
+    assert data[0] == BINARY_VERSION
+    data[0] = 1
+    with pytest.raises(ValueError):
+        unpack_frame(bytes(data))
+    assert HEADER.size == 24
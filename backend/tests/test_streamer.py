@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+from PIL import Image  # noqa: E402
+from app.backends import ModelBackend  # noqa: E402
+from app.result_cache import CachedResult, ResultCache  # noqa: E402
+from app.streamer import VideoStreamer  # noqa: E402
+
+DETECTIONS = [{"label": "Train", "confidence": 0.9, "bbox": [1, 2, 3, 4]}]
+
+
+class EchoBackend(ModelBackend):
+    """Returns its input; enough to drive the streamer without a model."""
+
+    def load(self):
+        pass
+
+    def prepare(self, frames):
+        return frames
+
+    def forward(self, inputs):
+        return inputs
+
+    def finish(self, outputs, shape):
+        return [frame.copy() for frame in outputs]
+
+
+def image_folder(tmp_path, count=3):
+    for i in range(count):
+        Image.fromarray(np.full((32, 48, 3), i * 40, dtype=np.uint8)).save(
+            tmp_path / f"frame_{i:03d}.png")
+    return str(tmp_path)
+
+
+def test_cache_hit_after_warm_up_carries_detections(tmp_path):
+    calls = []
+
+    def detector(rgb):
+        calls.append(rgb.shape)
+        return {"detections": DETECTIONS}
+
+    streamer = VideoStreamer(None, backend=EchoBackend(), result_cache=ResultCache(),
+                             detector=detector)
+    try:
+        assert streamer.reload_images(image_folder(tmp_path))
+        streamer.warm_cache().join(5)
+        assert len(calls) == 3
+
+        for path in list(streamer.image_files):
+            cached = streamer._load(path)
+            assert isinstance(cached, CachedResult)
+            [(frame, _, enhanced, result)] = streamer.process_batch([(path, cached)])
+            assert enhanced is None
+            assert streamer._detect((frame, enhanced, result)) is None
+            assert frame["detections"] == DETECTIONS
+        assert len(calls) == 3  # Hits are not detected again
+    finally:
+        streamer.close()
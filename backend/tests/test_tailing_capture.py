@@ -0,0 +1,66 @@
+import time
+import pytest
+
+pytest.importorskip("cv2")
+from app.sources import TailingCapture  # noqa: E402
+
+
+class Cancelled(Exception):
+    pass
+
+
+def partial_upload(tmp_path):
+    path = tmp_path / "upload.mp4"
+    path.write_bytes(b"\x00" * 1024)  # Not decodable yet
+    return str(path)
+
+
+def test_stalled_upload_times_out(tmp_path):
+    cap = TailingCapture(partial_upload(tmp_path), is_complete=lambda: False,
+                         poll_interval=0.01, idle_timeout=0.1)
+    start = time.time()
+    with pytest.raises(TimeoutError):
+        cap.read()
+    assert time.time() - start < 2
+    cap.release()
+
+
+def test_cancel_check_aborts_the_wait(tmp_path):
+    calls = []
+
+    def check_cancelled():
+        calls.append(1)
+        if len(calls) >= 3:
+            raise Cancelled()
+
+    cap = TailingCapture(partial_upload(tmp_path), is_complete=lambda: False,
+                         poll_interval=0.01, check_cancelled=check_cancelled)
+    with pytest.raises(Cancelled):
+        cap.read()
+    cap.release()
+
+
+def test_growing_file_resets_the_idle_deadline(tmp_path):
+    path = partial_upload(tmp_path)
+    polls = []
+
+    def check_cancelled():
+        polls.append(1)
+        if len(polls) < 10:
+            with open(path, "ab") as f:
+                f.write(b"\x00")  # Still arriving
+        elif len(polls) > 100:
+            raise Cancelled()
+
+    cap = TailingCapture(path, is_complete=lambda: False, poll_interval=0.02,
+                         check_cancelled=check_cancelled, idle_timeout=0.1)
+    with pytest.raises(TimeoutError):
+        cap.read()
+    assert len(polls) >= 10  # Did not time out while the file was growing
+    cap.release()
+
+
+def test_complete_file_returns_eof(tmp_path):
+    cap = TailingCapture(partial_upload(tmp_path), is_complete=lambda: True, poll_interval=0.01)
+    assert cap.read() == (False, None)
+    cap.release()
@@ -0,0 +1,51 @@
+import os
+import time
+from app.uploads import UploadManager
+
+
+def make_manager(tmp_path, **kwargs):
+    return UploadManager(str(tmp_path), 1024, 4096, start_bytes=16, **kwargs)
+
+
+def test_expire_drops_idle_unfinished_upload(tmp_path):
+    manager = make_manager(tmp_path, expire_seconds=0.05)
+    session = manager.create("clip.mp4", 100)
+    session.write(0, b"x" * 10)
+    time.sleep(0.1)
+    assert manager.expire() == [session]
+    assert manager.get(session.id) is None
+    assert session.aborted and session.finished()
+    assert not os.path.exists(session.path)
+
+
+def test_expire_keeps_completed_upload_file(tmp_path):
+    manager = make_manager(tmp_path, expire_seconds=0.05)
+    session = manager.create("clip.mp4", 4)
+    session.write(0, b"abcd")
+    time.sleep(0.1)
+    manager.expire()
+    assert not session.aborted
+    assert os.path.exists(session.path)
+
+
+def test_sweep_thread_expires_without_new_uploads(tmp_path):
+    manager = make_manager(tmp_path, expire_seconds=0.05, sweep_interval=0.05)
+    session = manager.create("clip.mp4", 100)
+    deadline = time.time() + 2
+    while manager.get(session.id) is not None and time.time() < deadline:
+        time.sleep(0.02)
+    assert manager.get(session.id) is None
+    assert session.aborted
+
+
+def test_should_start_once_after_start_bytes(tmp_path):
+    manager = make_manager(tmp_path)
+    session = manager.create("clip.mp4", 100)
+    session.write(0, b"x" * 8)
+    assert not manager.should_start(session)
+    session.write(8, b"x" * 8)
+    assert manager.should_start(session)
+    assert not manager.should_start(session)
+    # A failed start (job queue full) is retried on the next chunk
+    session.started = False
+    assert manager.should_start(session)
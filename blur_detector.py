@@ -0,0 +1,140 @@
+"""
+Blur Detector - Laplacian variance blur scoring
+Used to decide whether a frame needs deblurring at all
+"""
+
+import os
+import argparse
+import cv2
+import numpy as np
+
+
+class BlurDetector:
+    """Detect blur in images using Laplacian variance method"""
+    
+    def __init__(self, threshold=100):
+        self.threshold = threshold
+    
+    def detect(self, image):
+        """
+        Detect if image is blurry
+        
+        Args:
+            image: numpy array (BGR or RGB)
+        
+        Returns:
+            is_blurry: bool
+            blur_score: float (lower = more blurry)
+        """
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+        
+        # Calculate Laplacian variance
+        laplacian = cv2.Laplacian(gray, cv2.CV_64F)
+        variance = laplacian.var()
+        
+        is_blurry = variance < self.threshold
+        
+        return is_blurry, variance
+    
+    def get_blur_map(self, image, block_size=32):
+        """
+        Generate a blur map showing which regions are blurry
+        
+        Args:
+            image: numpy array (BGR)
+            block_size: size of blocks to analyze
+        
+        Returns:
+            blur_map: numpy array showing blur intensity per region
+        """
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+        
+        h, w = gray.shape
+        blur_map = np.zeros((h, w), dtype=np.float32)
+        
+        for y in range(0, h - block_size, block_size):
+            for x in range(0, w - block_size, block_size):
+                block = gray[y:y+block_size, x:x+block_size]
+                laplacian = cv2.Laplacian(block, cv2.CV_64F)
+                variance = laplacian.var()
+                blur_map[y:y+block_size, x:x+block_size] = variance
+        
+        # Normalize to 0-255
+        if blur_map.max() > 0:
+            blur_map = (blur_map / blur_map.max() * 255).astype(np.uint8)
+        
+        # Apply colormap
+        blur_map_colored = cv2.applyColorMap(blur_map, cv2.COLORMAP_JET)
+        
+        return blur_map_colored
+
+
+def calibrate_threshold(sharp_scores, blurry_scores):
+    """
+    Pick the Laplacian-variance threshold that best separates sharp from
+    blurry samples (maximizes balanced accuracy).
+
+    Args:
+        sharp_scores: blur scores of known-sharp images
+        blurry_scores: blur scores of known-blurry images
+
+    Returns:
+        threshold: float (scores below it are treated as blurry)
+        accuracy: balanced accuracy at that threshold
+    """
+    sharp_scores = np.asarray(sharp_scores, dtype=np.float64)
+    blurry_scores = np.asarray(blurry_scores, dtype=np.float64)
+    candidates = np.unique(np.concatenate([sharp_scores, blurry_scores]))
+
+    best_threshold, best_accuracy = float(candidates[0]), 0.0
+    for threshold in candidates:
+        blurry_hit = np.mean(blurry_scores < threshold)
+        sharp_hit = np.mean(sharp_scores >= threshold)
+        accuracy = (blurry_hit + sharp_hit) / 2
+        if accuracy > best_accuracy:
+            best_threshold, best_accuracy = float(threshold), float(accuracy)
+
+    return best_threshold, best_accuracy
+
+
+def score_directory(detector, directory, limit=200):
+    """Blur scores for up to `limit` images in a directory"""
+    files = sorted(f for f in os.listdir(directory)
+                   if f.lower().endswith(('.png', '.jpg', '.jpeg')))[:limit]
+    scores = []
+    for f in files:
+        image = cv2.imread(os.path.join(directory, f))
+        if image is not None:
+            scores.append(detector.detect(image)[1])
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate the blur gate threshold')
+    parser.add_argument('--sharp', type=str, required=True,
+                        help='Directory of sharp images')
+    parser.add_argument('--blurred', type=str, required=True,
+                        help='Directory of blurred images')
+    parser.add_argument('--limit', type=int, default=200,
+                        help='Max images per directory')
+    
+    args = parser.parse_args()
+    
+    detector = BlurDetector()
+    sharp_scores = score_directory(detector, args.sharp, args.limit)
+    blurry_scores = score_directory(detector, args.blurred, args.limit)
+    
+    threshold, accuracy = calibrate_threshold(sharp_scores, blurry_scores)
+    print(f"Sharp:   n={len(sharp_scores)}, median score {np.median(sharp_scores):.2f}")
+    print(f"Blurred: n={len(blurry_scores)}, median score {np.median(blurry_scores):.2f}")
+    print(f"Calibrated threshold: {threshold:.2f} (balanced accuracy {accuracy:.1%})")
+
+
+if __name__ == '__main__':
+    main()
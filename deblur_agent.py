@@ -12,78 +12,15 @@ import torchvision.transforms.functional as TF
 
 from nafnet_model import NAFNetSmall, NAFNetMedium
 from parts_detector import PartsDetector
-
-
-class BlurDetector:
-    """Detect blur in images using Laplacian variance method"""
-    
-    def __init__(self, threshold=100):
-        self.threshold = threshold
-    
-    def detect(self, image):
-        """
-        Detect if image is blurry
-        
-        Args:
-            image: numpy array (BGR or RGB)
-        
-        Returns:
-            is_blurry: bool
-            blur_score: float (lower = more blurry)
-        """
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-        
-        # Calculate Laplacian variance
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-        variance = laplacian.var()
-        
-        is_blurry = variance < self.threshold
-        
-        return is_blurry, variance
-    
-    def get_blur_map(self, image, block_size=32):
-        """
-        Generate a blur map showing which regions are blurry
-        
-        Args:
-            image: numpy array (BGR)
-            block_size: size of blocks to analyze
-        
-        Returns:
-            blur_map: numpy array showing blur intensity per region
-        """
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-        
-        h, w = gray.shape
-        blur_map = np.zeros((h, w), dtype=np.float32)
-        
-        for y in range(0, h - block_size, block_size):
-            for x in range(0, w - block_size, block_size):
-                block = gray[y:y+block_size, x:x+block_size]
-                laplacian = cv2.Laplacian(block, cv2.CV_64F)
-                variance = laplacian.var()
-                blur_map[y:y+block_size, x:x+block_size] = variance
-        
-        # Normalize to 0-255
-        if blur_map.max() > 0:
-            blur_map = (blur_map / blur_map.max() * 255).astype(np.uint8)
-        
-        # Apply colormap
-        blur_map_colored = cv2.applyColorMap(blur_map, cv2.COLORMAP_JET)
-        
-        return blur_map_colored
+from blur_detector import BlurDetector
+from temporal_reuse import TemporalTileCache
 
 
 class DeblurAgent:
     """Main agent for deblurring images"""
     
-    def __init__(self, checkpoint_path=None, model_size='small', device=None):
+    def __init__(self, checkpoint_path=None, model_size='small', device=None,
+                 skip_sharp=False, blur_threshold=100, temporal_reuse=False, tile_size=128):
         """
         Initialize the deblurring agent
         
@@ -91,6 +28,12 @@ class DeblurAgent:
             checkpoint_path: Path to model checkpoint (.pth file)
             model_size: 'small' or 'medium'
             device: torch device (auto-detect if None)
+            skip_sharp: return frames unchanged when the blur detector says
+                they are already sharp (see blur_detector.py to calibrate)
+            blur_threshold: Laplacian variance below which a frame is blurry
+            temporal_reuse: for consecutive frames from a fixed camera, only
+                deblur tiles that changed since the previous frame
+            tile_size: tile edge in pixels for temporal_reuse
         """
         self.device = device or torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         print(f"DeblurAgent using: {self.device}")
@@ -112,8 +55,14 @@ class DeblurAgent:
         self.model = self.model.to(self.device)
         self.model.eval()
         
-        # Blur detector
-        self.blur_detector = BlurDetector()
+        # Blur detector (also gates deblur() when skip_sharp is set)
+        self.blur_detector = BlurDetector(threshold=blur_threshold)
+        self.skip_sharp = skip_sharp
+        self.gate_stats = {'checked': 0, 'skipped': 0}
+        
+        # Temporal tile reuse (see temporal_reuse.py); call reset_temporal()
+        # between unrelated images or videos
+        self.tile_cache = TemporalTileCache(tile_size=tile_size) if temporal_reuse else None
         
         # Parts detector
         print("Initializing detection model...")
@@ -189,6 +138,28 @@ class DeblurAgent:
         Returns:
             deblurred_image: numpy array (BGR)
         """
+        # Skip the network for frames that are already sharp
+        if self.skip_sharp:
+            if not isinstance(image, np.ndarray):
+                image = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+            is_blurry, _ = self.blur_detector.detect(image)
+            self.gate_stats['checked'] += 1
+            if not is_blurry:
+                self.gate_stats['skipped'] += 1
+                return image.copy()
+        
+        # Only recompute tiles that changed since the previous frame
+        if self.tile_cache is not None:
+            if not isinstance(image, np.ndarray):
+                image = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+            return self.tile_cache.process(
+                image, lambda crops: [self._deblur_full(c) for c in crops])
+        
+        return self._deblur_full(image)
+    
+    @torch.no_grad()
+    def _deblur_full(self, image):
+        """Runs the network on a whole image (BGR numpy array or PIL Image)"""
         # Preprocess
         input_tensor = self.preprocess(image).to(self.device)
         
@@ -200,6 +171,11 @@ class DeblurAgent:
         
         return output_image
     
+    def reset_temporal(self):
+        """Forget the previous frame (new video or unrelated image)"""
+        if self.tile_cache is not None:
+            self.tile_cache.reset()
+    
     def analyze(self, image):
         """
         Analyze blur in an image
@@ -2,11 +2,25 @@ import React, { useState } from 'react';
 import { Upload, FileVideo, Play, CheckCircle } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 
+// Safari (and other native HLS players) can start on the growing playlist;
+// elsewhere the fragmented MP4 is played as it is written
+const canPlayHls = () => document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== '';
+const playbackUrl = (result) => (result.playlist_url && canPlayHls() ? result.playlist_url : result.video_url);
+// The event playlist is final once it has #EXT-X-ENDLIST, but a player that opened the
+// fragmented MP4 mid-write keeps the length it saw, so reload it under a new URL when done
+const finalPlaybackUrl = (result) => {
+    const url = playbackUrl(result);
+    if (url === result.playlist_url) return url;
+    return `${url}${url.includes('?') ? '&' : '?'}complete=1`;
+};
+
 const Dashboard = () => {
     const [selectedFile, setSelectedFile] = useState(null);
     const [uploading, setUploading] = useState(false);
     const [status, setStatus] = useState(null);
     const [processedVideoUrl, setProcessedVideoUrl] = useState(null);
+    const [downloadUrl, setDownloadUrl] = useState(null);
+    const [processingDone, setProcessingDone] = useState(false);
 
     const handleFileChange = (e) => {
         if (e.target.files && e.target.files[0]) {
@@ -20,6 +34,8 @@ const Dashboard = () => {
 
         setUploading(true);
         setStatus('Uploading and Extracting Frames...');
+        setProcessedVideoUrl(null);
+        setProcessingDone(false);
 
         const formData = new FormData();
         formData.append('file', selectedFile);
@@ -35,11 +51,41 @@ const Dashboard = () => {
                 throw new Error('Upload failed');
             }
 
-            const result = await response.json();
-
-            setStatus(`Success! ${result.frames_extracted} frames extracted. Stream Updated.`);
-            if (result.video_url) {
-                setProcessedVideoUrl(result.video_url);
+            const { job_id } = await response.json();
+
+            // Post-processing runs as a background job; poll it for progress
+            let job;
+            do {
+                await new Promise((resolve) => setTimeout(resolve, 1000));
+                const jobResponse = await fetch(`http://localhost:8000/jobs/${job_id}`);
+                if (!jobResponse.ok) {
+                    throw new Error('Lost track of the processing job');
+                }
+                job = await jobResponse.json();
+                if (job.state === 'queued') {
+                    setStatus('Stream updated. Waiting for a processing slot...');
+                } else if (job.state === 'running') {
+                    const percent = job.progress !== null ? Math.round(job.progress * 100) : 0;
+                    const eta = job.eta_seconds !== null ? `, ~${Math.ceil(job.eta_seconds)}s left` : '';
+                    setStatus(`Stream updated. Processing (${job.stage || 'starting'}): ${percent}%${eta}`);
+                    // The annotated video becomes playable after its first segment
+                    if (job.result && job.result.video_url) {
+                        setProcessedVideoUrl((current) => current || playbackUrl(job.result));
+                        setDownloadUrl(job.result.video_url);
+                    }
+                }
+            } while (job.state === 'queued' || job.state === 'running');
+
+            if (job.state !== 'done') {
+                throw new Error(job.error || `Processing ${job.state}`);
+            }
+            setStatus(`Success! ${job.result.frames_extracted} frames extracted. Stream Updated.`);
+            setProcessingDone(true);
+            if (job.result.video_url) {
+                setProcessedVideoUrl(finalPlaybackUrl(job.result));
+                setDownloadUrl(job.result.video_url);
+            } else {
+                setProcessedVideoUrl(null);
             }
         } catch (error) {
             console.error('Error:', error);
@@ -125,11 +171,11 @@ const Dashboard = () => {
                     <div className={`bg-[#101622] border border-[#232f48] rounded-2xl p-8 space-y-6 shadow-2xl flex flex-col items-center justify-center text-center ${!processedVideoUrl ? 'opacity-60' : ''}`}>
                         {processedVideoUrl ? (
                             <div className="w-full space-y-4">
-                                <h3 className="text-xl font-semibold text-green-400">Detection Complete</h3>
+                                <h3 className="text-xl font-semibold text-green-400">{processingDone ? 'Detection Complete' : 'Detection In Progress'}</h3>
                                 <div className="rounded-xl overflow-hidden border border-[#232f48] shadow-lg bg-black">
                                     <video src={processedVideoUrl} controls className="w-full h-auto" />
                                 </div>
-                                <Button onClick={() => window.open(processedVideoUrl, '_blank')} variant="outline" className="border-blue-500/20 text-blue-400 hover:bg-blue-500/10">
+                                <Button onClick={() => window.open(downloadUrl, '_blank')} disabled={!processingDone} variant="outline" className="border-blue-500/20 text-blue-400 hover:bg-blue-500/10">
                                     Download Processed Video
                                 </Button>
                             </div>
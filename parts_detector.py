@@ -33,21 +33,33 @@ class PartsDetector:
             7: 'Truck'
         }
 
-    def detect(self, image, conf_threshold=0.25):
+    def detect(self, image, conf_threshold=0.25, annotate=True):
         """
         Detect objects in image
         Args:
             image: numpy array (BGR)
             conf_threshold: confidence threshold
+            annotate: draw boxes on a copy of the image (skip for live pipelines)
         Returns:
             detections: list of dicts with bbox, class, confidence
-            annotated_image: image with bounding boxes drawn
+            annotated_image: image with bounding boxes drawn (None if annotate=False)
         """
         # Run inference
         results = self.model(image, conf=conf_threshold, verbose=False)[0]
-        
+        return self._parse(results, image, annotate)
+
+    def detect_batch(self, images, conf_threshold=0.25):
+        """
+        Detect objects in several images with one batched forward.
+        Returns a list of detection lists, one per image (no annotation).
+        """
+        results = self.model(list(images), conf=conf_threshold, verbose=False)
+        return [self._parse(result, image, annotate=False)[0]
+                for result, image in zip(results, images)]
+
+    def _parse(self, results, image, annotate):
         detections = []
-        annotated_image = image.copy()
+        annotated_image = image.copy() if annotate else None
         
         for box in results.boxes:
             cls_id = int(box.cls[0].item())
@@ -64,6 +76,9 @@ class PartsDetector:
                     'confidence': conf
                 })
                 
+                if not annotate:
+                    continue
+                
                 # Draw box
                 color = (0, 255, 0) # Green for vehicles
                 if label == 'Train':
@@ -71,6 +71,19 @@ class WagonOCR:
         Detect wagons and read numbers using ensemble OCR.
         """
         detections, _ = self.detector.detect(frame, conf_threshold=0.25)
+        return self.read_wagons(frame, detections, frame_id)
+
+    def process_frames(self, frames, start_id=0):
+        """
+        Like process_frame for several frames: wagon detection runs as one
+        batched forward. Returns one result list per frame.
+        """
+        all_detections = self.detector.detect_batch(frames, conf_threshold=0.25)
+        return [self.read_wagons(frame, detections, start_id + i)
+                for i, (frame, detections) in enumerate(zip(frames, all_detections))]
+
+    def read_wagons(self, frame, detections, frame_id=0):
+        """Reads the number of every wagon in `detections`."""
         wagon_results = []
 
         for det in detections:
@@ -102,8 +115,10 @@ class WagonOCR:
             # Wagon numbers are typically uppercase alphanumeric
             allowlist = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
             
-            for method_name, processed_crop in self.preprocess_variants(wagon_crop):
-                ocr_results = self.reader.readtext(processed_crop, mag_ratio=1.0, allowlist=allowlist)
+            # All variants have the same size, so they are recognised in one batch
+            variants = [crop for _, crop in self.preprocess_variants(wagon_crop)]
+            batched = self.reader.readtext_batched(variants, mag_ratio=1.0, allowlist=allowlist)
+            for ocr_results in batched:
                 
                 for (_, text, prob) in ocr_results:
                     # Basic cleanup